@@ -0,0 +1,168 @@
+import argparse
+import multiprocessing
+import os
+import random
+from collections import Counter
+
+from snapshot import load_graph
+
+# The Graph being analysed; set before worker processes are started
+graph = None
+
+
+def costar_degrees(people):
+    """
+    Returns a Counter of ("degree", k) -> how many of the given people
+    have k distinct co-stars.
+    """
+    counts = Counter()
+    for person in people:
+        counts["degree", len(graph.costars(person))] += 1
+    return counts
+
+
+def multi_source_bfs(sources):
+    """
+    Runs a breadth-first search from every person in `sources` at once.
+
+    Bit i of reached[p] records that sources[i] has reached person p, so
+    each level is one pass over the movies of the people on the frontier
+    however many sources there are. Returns a Counter of
+    ("separation", d) -> (source, person) pairs d degrees apart, and
+    ("eccentricity", e) -> sources whose furthest reachable person is
+    e degrees away.
+    """
+    reached = {}
+    for bit, source in enumerate(sources):
+        reached[source] = reached.get(source, 0) | 1 << bit
+    frontier = dict(reached)
+
+    counts = Counter()
+    # Sources that reached someone new at the previous level
+    previous = (1 << len(sources)) - 1
+    level = 0
+    while previous:
+        level += 1
+        movie_bits = {}
+        for person, bits in frontier.items():
+            for movie in graph.movies_for(person):
+                movie_bits[movie] = movie_bits.get(movie, 0) | bits
+
+        next_frontier = {}
+        for movie, bits in movie_bits.items():
+            for person in graph.stars_for(movie):
+                new = bits & ~reached.get(person, 0)
+                if new:
+                    reached[person] = reached.get(person, 0) | new
+                    next_frontier[person] = next_frontier.get(person, 0) | new
+
+        advanced = 0
+        for bits in next_frontier.values():
+            counts["separation", level] += bits.bit_count()
+            advanced |= bits
+
+        # A source that reaches no one new never will again
+        counts["eccentricity", level - 1] += (previous & ~advanced).bit_count()
+        previous = advanced
+        frontier = next_frontier
+    return counts
+
+
+def init_worker(directory):
+    """
+    Loads the graph in workers that did not inherit it by forking.
+    """
+    global graph
+    if graph is None:
+        graph = load_graph(directory)
+
+
+def run(function, tasks, workers, directory):
+    """
+    Applies `function` to every task, across a process pool when
+    `workers` is more than 1, and returns the sum of the Counters.
+    Forked workers share the parent's memory-mapped graph.
+    """
+    total = Counter()
+    if workers <= 1:
+        for counts in map(function, tasks):
+            total.update(counts)
+        return total
+
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+    else:
+        context = multiprocessing.get_context()
+    with context.Pool(workers, initializer=init_worker,
+                      initargs=(directory,)) as pool:
+        for counts in pool.imap_unordered(function, tasks):
+            total.update(counts)
+    return total
+
+
+def histogram(counts, key):
+    """
+    Returns sorted (value, count) pairs for one kind of key in `counts`.
+    """
+    return sorted((value, n) for (kind, value), n in counts.items()
+                  if kind == key and n)
+
+
+def main():
+    global graph
+
+    parser = argparse.ArgumentParser(
+        description="Degree and separation statistics for a Degrees dataset."
+    )
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--sources", type=int, default=1024,
+                        help="people sampled as breadth-first search sources")
+    parser.add_argument("--width", type=int, default=256,
+                        help="sources searched together in one bitset")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print("Loading data...")
+    graph = load_graph(args.directory)
+    people = graph.person_count()
+    print(f"{people} people, {graph.movie_count()} movies.")
+
+    chunk = 10000
+    counts = run(costar_degrees,
+                 [range(i, min(i + chunk, people)) for i in range(0, people, chunk)],
+                 args.workers, args.directory)
+    print("Co-star degree histogram:")
+    bins = Counter()
+    for degree, n in histogram(counts, "degree"):
+        bins[0 if degree == 0 else degree.bit_length()] += n
+    for bucket, n in sorted(bins.items()):
+        low, high = (0, 0) if bucket == 0 else (2 ** (bucket - 1), 2 ** bucket - 1)
+        print(f"  {low:>7}-{high:<7} {n:>10}")
+
+    sources = random.Random(args.seed).sample(range(people),
+                                              min(args.sources, people))
+    counts = run(multi_source_bfs,
+                 [sources[i:i + args.width]
+                  for i in range(0, len(sources), args.width)],
+                 args.workers, args.directory)
+
+    separations = histogram(counts, "separation")
+    connected = sum(n for _, n in separations)
+    total = len(sources) * (people - 1)
+    print(f"Degrees of separation from {len(sources)} sampled people:")
+    for distance, n in separations:
+        print(f"  {distance:>3} {n:>12} {100 * n / total:>7.2f}%")
+    print(f"  not connected {total - connected} "
+          f"({100 * (total - connected) / total:.2f}%)")
+    if connected:
+        mean = sum(d * n for d, n in separations) / connected
+        print(f"  mean over connected pairs: {mean:.2f}")
+
+    print("Eccentricity of sampled people:")
+    for eccentricity, n in histogram(counts, "eccentricity"):
+        print(f"  {eccentricity:>3} {n:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import argparse
+import random
+import sys
+import time
+
+import degrees
+from landmarks import UNREACHABLE, distances_from
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def peak_memory():
+    """
+    Returns the peak resident memory of this process in MB, or None
+    where the resource module is not available.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+def all_person_ids():
+    if degrees.graph is not None:
+        graph = degrees.graph
+        return [graph.person_ids[p] for p in range(graph.person_count())]
+    return list(degrees.people)
+
+
+def component(person_id):
+    if degrees.graph is not None:
+        return degrees.graph.components[degrees.graph.person_index(person_id)]
+    return degrees.components[person_id]
+
+
+def layers_from(source):
+    """
+    Returns the people at each number of degrees from `source`.
+    """
+    graph = degrees.graph
+    if graph is not None:
+        layers = []
+        distances = distances_from(graph, graph.person_index(source))
+        for person, distance in enumerate(distances):
+            if distance == UNREACHABLE:
+                continue
+            while len(layers) <= distance:
+                layers.append([])
+            layers[distance].append(graph.person_ids[person])
+        return layers
+
+    seen = {source}
+    layers = [[source]]
+    while layers[-1]:
+        layer = []
+        for person_id in layers[-1]:
+            for _, other in degrees.costars_for_person(person_id):
+                if other not in seen:
+                    seen.add(other)
+                    layer.append(other)
+        layers.append(layer)
+    return layers[:-1]
+
+
+def sample_pairs(count, rng):
+    """
+    Returns lists of near (1-2 degrees), far (the furthest layer from
+    the source) and disconnected (source, target) pairs, about `count`
+    of each, from random sources at least three layers deep.
+    """
+    person_ids = all_person_ids()
+    near, far, disconnected = [], [], []
+    for _ in range(100 * count):
+        if min(len(near), len(far), len(disconnected)) >= count:
+            break
+        source = rng.choice(person_ids)
+        layers = layers_from(source)
+        if len(layers) < 3:
+            continue
+        for _ in range(max(1, count // 10)):
+            near.append((source, rng.choice(layers[rng.choice((1, 2))])))
+            far.append((source, rng.choice(layers[-1])))
+            target = rng.choice(person_ids)
+            if component(target) != component(source):
+                disconnected.append((source, target))
+    return {
+        "near": near[:count],
+        "far": far[:count],
+        "disconnected": disconnected[:count],
+    }
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure loading and shortest_path on a Degrees dataset."
+    )
+    parser.add_argument("directory")
+    parser.add_argument("--compact", action="store_true")
+    parser.add_argument("--no-cache", dest="cache", action="store_false")
+    parser.add_argument("--queries", type=int, default=100,
+                        help="queries per kind of pair")
+    parser.add_argument("--method", choices=degrees.METHODS,
+                        default="bidirectional",
+                        help="search engine to measure (astar needs "
+                             "--compact and a landmark index)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    before = peak_memory()
+    start = time.perf_counter()
+    degrees.load_data(args.directory, compact=args.compact, cache=args.cache)
+    elapsed = time.perf_counter() - start
+    after = peak_memory()
+    print(f"Load: {elapsed:.3f}s")
+    if after is not None:
+        print(f"Peak memory: {after:.1f} MB ({after - before:+.1f} MB loading)")
+
+    pairs = sample_pairs(args.queries, random.Random(args.seed))
+    print("Query latency (ms)     n      p50      p90      p99      max"
+          "   expanded")
+    for kind, kind_pairs in pairs.items():
+        if not kind_pairs:
+            print(f"  {kind:<14} no pairs found")
+            continue
+        latencies = []
+        expanded = 0
+        for source, target in kind_pairs:
+            stats = {}
+            start = time.perf_counter()
+            degrees.shortest_path(source, target, stats=stats,
+                                  method=args.method)
+            latencies.append(1000 * (time.perf_counter() - start))
+            expanded += stats["expanded"]
+        print(f"  {kind:<14} {len(latencies):>7} "
+              f"{percentile(latencies, 0.5):>8.2f} "
+              f"{percentile(latencies, 0.9):>8.2f} "
+              f"{percentile(latencies, 0.99):>8.2f} "
+              f"{max(latencies):>8.2f} "
+              f"{expanded / len(latencies):>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,16 @@
+import argparse
 import csv
+import heapq
+import json
+import math
+import multiprocessing
+import os
 import sys
 
-from util import Node, StackFrontier, QueueFrontier
+from landmarks import load_landmarks
+from nameindex import NameIndex
+from snapshot import load_graph
+from util import LRUCache, Node, StackFrontier, QueueFrontier
 
 
 # Maps names to a set of corresponding person_ids
@@ -13,11 +22,53 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# Maps person_ids to the label of the connected component they belong to
+components = {}
 
-def load_data(directory):
+# Compact integer-indexed Graph, used instead of the dictionaries above
+# when the data is loaded with compact=True
+graph = None
+
+# Optional LandmarkIndex over `graph`, which lets searches use A*
+landmarks = None
+
+# Search engines shortest_path can run, the default first
+METHODS = ("bidirectional", "bfs", "astar")
+
+# Optional LRUCache of co-stars per person, see enable_costar_cache
+costar_cache = None
+
+# NameIndex over everyone's names, built once on first use by name_index
+people_index = None
+
+
+def load_data(directory, compact=False, cache=True):
     """
     Load data from CSV files into memory.
+
+    With compact=True the data goes into a CSR `graph` instead of the
+    `names`, `people` and `movies` dictionaries. The graph is then
+    memory-mapped from a snapshot next to the CSV files when one is up
+    to date, and a new snapshot is written when it is not, unless
+    `cache` is False. A landmark index built by landmarks.py is picked
+    up as well if it is up to date, for shortest_path(method="astar").
+
+    Whatever a previous call loaded, with either backend, is dropped
+    first, so searches never mix the two.
     """
+    global graph, landmarks, people_index
+    names.clear()
+    people.clear()
+    movies.clear()
+    components.clear()
+    graph = landmarks = people_index = None
+    if costar_cache is not None:
+        costar_cache.clear()
+    if compact:
+        graph = load_graph(directory, cache=cache)
+        landmarks = load_landmarks(directory)
+        return
+
     # Load people
     with open(f"{directory}/people.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
@@ -47,22 +98,78 @@ def load_data(directory):
         reader = csv.DictReader(f)
         for row in reader:
             try:
-                people[row["person_id"]]["movies"].add(row["movie_id"])
-                movies[row["movie_id"]]["stars"].add(row["person_id"])
+                person = people[row["person_id"]]
+                movie = movies[row["movie_id"]]
             except KeyError:
-                pass
+                continue
+            person["movies"].add(row["movie_id"])
+            movie["stars"].add(row["person_id"])
+
+    label_components()
+
+
+def label_components():
+    """
+    Labels every person in `people` with their connected component,
+    so that pairs in different components need no search at all.
+    """
+    components.clear()
+    seen_movies = set()
+    label = 0
+    for start in people:
+        if start in components:
+            continue
+        label += 1
+        components[start] = label
+        frontier = [start]
+        while frontier:
+            person = frontier.pop()
+            for movie in people[person]["movies"] - seen_movies:
+                seen_movies.add(movie)
+                for other in movies[movie]["stars"]:
+                    if other not in components:
+                        components[other] = label
+                        frontier.append(other)
 
 
 def main():
 
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    parser = argparse.ArgumentParser()
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--compact", action="store_true",
+                        help="load the data into a compact CSR graph")
+    parser.add_argument("--no-cache", dest="cache", action="store_false",
+                        help="with --compact, ignore and do not write snapshots")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="answer the source,target pairs in FILE ('-' for "
+                             "stdin) and write JSON lines to stdout")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="worker processes for --batch")
+    parser.add_argument("--astar", action="store_true",
+                        help="with --compact, search with A* over the "
+                             "landmark index built by landmarks.py")
+    parser.add_argument("--stats", action="store_true",
+                        help="report nodes expanded, compared with both "
+                             "breadth-first searches")
+    parser.add_argument("--costar-cache", type=int, default=0, metavar="N",
+                        help="cache up to N co-star entries between searches")
+    args = parser.parse_args()
+    enable_costar_cache(args.costar_cache)
+
+    if args.batch is not None:
+        load_data(args.directory, compact=args.compact, cache=args.cache)
+        with (sys.stdin if args.batch == "-"
+              else open(args.batch, encoding="utf-8")) as f:
+            run_batch(f, sys.stdout, args.workers,
+                      (args.directory, args.compact, args.cache))
+        return
 
     # Load data from files into memory
     print("Loading data...")
-    load_data(directory)
+    load_data(args.directory, compact=args.compact, cache=args.cache)
     print("Data loaded.")
+    if args.astar and landmarks is None:
+        sys.exit("--astar needs --compact and an index built by landmarks.py.")
 
     source = person_id_for_name(input("Name: "))
     if source is None:
@@ -71,7 +178,23 @@ def main():
     if target is None:
         sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    method = "astar" if args.astar else "bidirectional"
+    stats = {}
+    path = shortest_path(source, target, stats=stats, method=method)
+
+    if args.stats:
+        others = []
+        for other, label in (("bidirectional", "bidirectional BFS"),
+                             ("bfs", "plain BFS")):
+            if other != method:
+                baseline = {}
+                shortest_path(source, target, stats=baseline, method=other)
+                others.append(f"{label}: {baseline['expanded']}")
+        print(f"Expanded {stats['expanded']} nodes ({', '.join(others)}).")
+        if costar_cache is not None:
+            info = costar_cache.info()
+            print(f"Co-star cache: {info['hits']} hits, {info['misses']} misses, "
+                  f"{info['evictions']} evictions.")
 
     if path is None:
         print("Not connected.")
@@ -80,16 +203,72 @@ def main():
         print(f"{degrees} degrees of separation.")
         path = [(None, source)] + path
         for i in range(degrees):
-            person1 = people[path[i][1]]["name"]
-            person2 = people[path[i + 1][1]]["name"]
-            movie = movies[path[i + 1][0]]["title"]
+            person1 = person_info(path[i][1])["name"]
+            person2 = person_info(path[i + 1][1])["name"]
+            movie = movie_info(path[i + 1][0])["title"]
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def shortest_path(source, target):
+def shortest_path(source, target, stats=None, method="bidirectional"):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target.
+
+    If no possible path, returns None.
+
+    By default (method="bidirectional") frontiers are grown from both
+    the source and the target until they meet. method="bfs" runs a
+    plain breadth-first search from the source, and method="astar" an
+    A* search over the loaded landmark index, which needs the compact
+    graph and an index built by landmarks.py. If `stats` is a
+    dictionary, the number of nodes expanded is added to
+    stats["expanded"].
+
+    People in different connected components are answered without
+    searching, so every search that does run is known to succeed.
+    """
+    if method not in METHODS:
+        raise ValueError(f"unknown search method {method!r}")
+    if method == "astar" and landmarks is None:
+        raise ValueError("A* needs the compact graph and a landmark index "
+                         "built by landmarks.py")
+    search = (breadth_first_search if method == "bfs"
+              else bidirectional_search)
+
+    if graph is None:
+        if components[source] != components[target]:
+            count_expanded(stats, 0)
+            return None
+        neighbors = cached_costars if costar_cache is not None else neighbors_for_person
+        return search(source, target, neighbors, stats)
+
+    source, target = graph.person_index(source), graph.person_index(target)
+    if not graph.connected(source, target):
+        count_expanded(stats, 0)
+        return None
+    neighbors = cached_costars if costar_cache is not None else graph.neighbors
+    if method == "astar":
+        path = astar_search(source, target, neighbors,
+                            landmarks.heuristic(target), stats)
+    else:
+        path = search(source, target, neighbors, stats)
+    if path is None:
+        return None
+    return [(graph.movie_ids[movie], graph.person_ids[person])
+            for movie, person in path]
+
+
+def count_expanded(stats, expanded):
+    if stats is not None:
+        stats["expanded"] = stats.get("expanded", 0) + expanded
 
 
-    start = Node(state = source, parent = None, action = None)
+def breadth_first_search(source, target, neighbors, stats=None):
+    """
+    Single-ended breadth-first search from `source` to `target`,
+    returning a list of (action, state) pairs or None.
+    """
+    start = Node(state=source, parent=None, action=None)
     frontier = QueueFrontier()
     frontier.add(start)
 
@@ -97,10 +276,12 @@ def shortest_path(source, target):
 
     while True:
         if frontier.empty():
+            count_expanded(stats, len(explored))
             return None
         node = frontier.remove()
 
         if node.state == target:
+            count_expanded(stats, len(explored))
             path = []
 
             while node.parent is not None:
@@ -108,25 +289,135 @@ def shortest_path(source, target):
                 node = node.parent
 
             path.reverse()
-            return (path)
+            return path
 
         explored.add(node.state)
 
-        neighbors = neighbors_for_person(node.state)
+        for action, state in neighbors(node.state):
+            if not frontier.contains_state(state) and state not in explored:
+                child = Node(state=state, parent=node, action=action)
+                frontier.add(child)
+
 
-        for movie, person in neighbors:
-                if not frontier.contains_state(person) and person not in explored:
-                    child = Node(state=person, parent=node, action=movie)
-                    frontier.add(child)
+def bidirectional_search(source, target, neighbors, stats=None):
     """
-    Returns the shortest list of (movie_id, person_id) pairs
-    that connect the source to the target.
+    Breadth-first search from both ends of the query at once.
 
-    If no possible path, returns None.
+    `neighbors` maps a state to its (action, state) pairs and must be
+    symmetric. The smaller frontier is expanded one full level at a time;
+    once a level touches the other side, the shortest crossing found in
+    that level is returned as a list of (action, state) pairs.
+    """
+    if source == target:
+        count_expanded(stats, 0)
+        return []
+
+    # Maps each reached state to (action, previous state) and its depth
+    parents = ({source: None}, {target: None})
+    depths = ({source: 0}, {target: 0})
+    frontiers = ([source], [target])
+    expanded = 0
+
+    while frontiers[0] and frontiers[1]:
+        side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+        expanded += len(frontiers[side])
+        seen, other = parents[side], parents[1 - side]
+        depth, other_depth = depths[side], depths[1 - side]
+
+        best = None
+        next_frontier = []
+        for state in frontiers[side]:
+            for action, neighbor in neighbors(state):
+                if neighbor in seen:
+                    continue
+                seen[neighbor] = (action, state)
+                depth[neighbor] = depth[state] + 1
+                next_frontier.append(neighbor)
+                if neighbor in other:
+                    length = depth[neighbor] + other_depth[neighbor]
+                    if best is None or length < best[0]:
+                        best = (length, neighbor)
+
+        if best is not None:
+            count_expanded(stats, expanded)
+            return join_paths(parents[0], parents[1], best[1])
+        frontiers = (
+            (next_frontier, frontiers[1]) if side == 0
+            else (frontiers[0], next_frontier)
+        )
+
+    count_expanded(stats, expanded)
+    return None
+
+
+def astar_search(source, target, neighbors, heuristic, stats=None):
+    """
+    A* search from `source` to `target` where every step costs 1.
+
+    `heuristic` must never overestimate the remaining steps, and may
+    return infinity for states that cannot reach the target at all.
+    Returns a list of (action, state) pairs or None.
     """
+    if heuristic(source) == math.inf:
+        count_expanded(stats, 0)
+        return None
+
+    parents = {source: None}
+    costs = {source: 0}
+    # Ties on f are broken towards deeper states, which are closer
+    heap = [(heuristic(source), 0, source)]
+    explored = set()
+
+    while heap:
+        _, cost, state = heapq.heappop(heap)
+        if state in explored:
+            continue
+
+        if state == target:
+            count_expanded(stats, len(explored))
+            path = []
+            while parents[state] is not None:
+                action, previous = parents[state]
+                path.append((action, state))
+                state = previous
+            path.reverse()
+            return path
 
-    # TODO
-    raise NotImplementedError
+        explored.add(state)
+        cost = -cost + 1
+        for action, neighbor in neighbors(state):
+            if neighbor in costs and costs[neighbor] <= cost:
+                continue
+            estimate = heuristic(neighbor)
+            if estimate == math.inf:
+                continue
+            costs[neighbor] = cost
+            parents[neighbor] = (action, state)
+            heapq.heappush(heap, (cost + estimate, -cost, neighbor))
+
+    count_expanded(stats, len(explored))
+    return None
+
+
+def join_paths(forward, backward, meeting):
+    """
+    Returns the (action, state) path through `meeting`, given the parent
+    maps grown from the source (`forward`) and the target (`backward`).
+    """
+    path = []
+    state = meeting
+    while forward[state] is not None:
+        action, previous = forward[state]
+        path.append((action, state))
+        state = previous
+    path.reverse()
+
+    state = meeting
+    while backward[state] is not None:
+        action, following = backward[state]
+        path.append((action, following))
+        state = following
+    return path
 
 
 def person_id_for_name(name):
@@ -134,13 +425,16 @@ def person_id_for_name(name):
     Returns the IMDB id for a person's name,
     resolving ambiguities as needed.
     """
-    person_ids = list(names.get(name.lower(), set()))
+    if graph is not None:
+        person_ids = [graph.person_ids[i] for i in graph.people_named(name)]
+    else:
+        person_ids = list(names.get(name.lower(), set()))
     if len(person_ids) == 0:
         return None
     elif len(person_ids) > 1:
         print(f"Which '{name}'?")
         for person_id in person_ids:
-            person = people[person_id]
+            person = person_info(person_id)
             name = person["name"]
             birth = person["birth"]
             print(f"ID: {person_id}, Name: {name}, Birth: {birth}")
@@ -160,6 +454,12 @@ def neighbors_for_person(person_id):
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
+    if graph is not None:
+        return {
+            (graph.movie_ids[movie], graph.person_ids[person])
+            for movie, person in graph.neighbors(graph.person_index(person_id))
+        }
+
     movie_ids = people[person_id]["movies"]
     neighbors = set()
     for movie_id in movie_ids:
@@ -168,5 +468,213 @@ def neighbors_for_person(person_id):
     return neighbors
 
 
+def person_ids_for(value):
+    """
+    Returns the person_ids matching `value`, which may be an IMDB id
+    or a name, without asking the user to resolve ambiguities.
+    """
+    if graph is not None:
+        if graph.person_index(value) is not None:
+            return [value]
+        return [graph.person_ids[i] for i in graph.people_named(value)]
+    if value in people:
+        return [value]
+    return sorted(names.get(value.lower(), set()))
+
+
+def batch_query(pair):
+    """
+    Answers one (source, target) pair of names or ids from a batch,
+    returning a dictionary ready to be written as a JSON line.
+    """
+    result = {"source": pair[0], "target": pair[1]}
+    person_ids = []
+    for value in pair:
+        matches = person_ids_for(value)
+        if len(matches) != 1:
+            result["error"] = "ambiguous" if matches else "not found"
+            result["person"] = value
+            result["candidates"] = lookup_people(value, max(10, len(matches)))
+            return result
+        person_ids.append(matches[0])
+
+    stats = {}
+    path = shortest_path(*person_ids, stats=stats)
+    result["expanded"] = stats["expanded"]
+    if path is None:
+        result["degrees"] = result["path"] = None
+    else:
+        result["degrees"] = len(path)
+        result["path"] = [
+            {"movie": movie, "person": person} for movie, person in path
+        ]
+    return result
+
+
+def read_pairs(f):
+    """
+    Yields (source, target) pairs from CSV rows of two names or ids,
+    skipping blank lines.
+    """
+    for row in csv.reader(f):
+        if not row:
+            continue
+        if len(row) != 2:
+            raise ValueError(f"Expected source,target but got: {row}")
+        yield row[0].strip(), row[1].strip()
+
+
+def init_worker(directory, compact, cache):
+    """
+    Makes sure a batch worker has the data loaded. Forked workers
+    already share the parent's copy, so this only loads when the
+    platform spawns fresh interpreters.
+    """
+    if graph is None and not people:
+        load_data(directory, compact=compact, cache=cache)
+
+
+def run_batch(f, output, workers, dataset):
+    """
+    Answers every pair read from `f`, writing one JSON line per pair to
+    `output` in input order.
+
+    With more than one worker the pairs are spread across a process
+    pool. Where fork is available the workers inherit the loaded graph
+    read-only (with compact=True that is the memory-mapped snapshot, so
+    the pages really are shared); elsewhere each worker loads `dataset`,
+    a (directory, compact, cache) tuple, itself.
+    """
+    pairs = read_pairs(f)
+    # Build the name index before forking so that workers share it
+    name_index()
+    if workers <= 1:
+        for result in map(batch_query, pairs):
+            output.write(json.dumps(result) + "\n")
+        return
+
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+    else:
+        context = multiprocessing.get_context()
+    with context.Pool(workers, initializer=init_worker,
+                      initargs=dataset) as pool:
+        for result in pool.imap(batch_query, pairs, chunksize=16):
+            output.write(json.dumps(result) + "\n")
+
+
+def enable_costar_cache(capacity):
+    """
+    Keeps the co-stars of recently searched people in an LRUCache holding
+    at most `capacity` (movie, person) entries in total, or turns the
+    cache off if `capacity` is 0.
+    """
+    global costar_cache
+    costar_cache = LRUCache(capacity, cost=len) if capacity > 0 else None
+
+
+def costars_for_person(person_id):
+    """
+    Returns (movie_id, person_id) pairs with one entry per co-star of
+    a given person, giving the first movie they starred in together.
+
+    With the co-star cache enabled and the dictionary backend, repeated
+    calls return the same cached tuple.
+    """
+    if graph is None:
+        if costar_cache is None:
+            return find_costars(person_id)
+        return cached_costars(person_id)
+    person = graph.person_index(person_id)
+    if costar_cache is None:
+        pairs = graph.costars(person)
+    else:
+        pairs = cached_costars(person)
+    return tuple(
+        (graph.movie_ids[movie], graph.person_ids[other])
+        for movie, other in pairs
+    )
+
+
+def find_costars(person_id):
+    first = {}
+    for movie_id in sorted(people[person_id]["movies"]):
+        for other in movies[movie_id]["stars"]:
+            first.setdefault(other, movie_id)
+    first.pop(person_id, None)
+    return tuple((movie_id, other) for other, movie_id in first.items())
+
+
+def cached_costars(state):
+    """
+    Returns the co-stars of a search state (a person_id, or a person
+    index with the compact graph) through `costar_cache`.
+    """
+    pairs = costar_cache.get(state)
+    if pairs is None:
+        pairs = graph.costars(state) if graph is not None else find_costars(state)
+        costar_cache.put(state, pairs)
+    return pairs
+
+
+def name_index():
+    """
+    Returns the NameIndex over every person's name, building it the
+    first time it is needed after load_data.
+    """
+    global people_index
+    if people_index is None:
+        if graph is not None:
+            entries = (
+                (graph.person_ids[person], graph.names[person])
+                for person in range(graph.person_count())
+            )
+        else:
+            entries = (
+                (person_id, person["name"])
+                for person_id, person in people.items()
+            )
+        people_index = NameIndex(entries)
+    return people_index
+
+
+def lookup_people(query, limit=10):
+    """
+    Returns up to `limit` people matching a full name, a prefix of one
+    or a misspelling, best first, without asking the user to choose.
+    Each candidate is a dictionary of id, name, birth and score.
+    """
+    candidates = []
+    for person_id, score in name_index().lookup(query, limit):
+        person = person_info(person_id)
+        candidates.append({
+            "id": person_id,
+            "name": person["name"],
+            "birth": person["birth"],
+            "score": round(score, 3),
+        })
+    return candidates
+
+
+def person_info(person_id):
+    """
+    Returns a dictionary with the name and birth of a person.
+    """
+    if graph is None:
+        return people[person_id]
+    person = graph.person_index(person_id)
+    return {"name": graph.names[person], "birth": graph.births[person]}
+
+
+def movie_info(movie_id):
+    """
+    Returns a dictionary with the title and year of a movie.
+    """
+    if graph is None:
+        return movies[movie_id]
+    movie = graph.movie_index(movie_id)
+    return {"title": graph.titles[movie], "year": graph.years[movie]}
+
+
 if __name__ == "__main__":
     main()
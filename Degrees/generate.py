@@ -0,0 +1,128 @@
+import argparse
+import csv
+import itertools
+import os
+import random
+
+FIRST_NAMES = [
+    "James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael",
+    "Linda", "William", "Elizabeth", "David", "Barbara", "Richard", "Susan",
+    "Joseph", "Jessica", "Thomas", "Sarah", "Charles", "Karen", "Emma",
+    "Kevin", "Tom", "Sally", "Gary", "Robin", "Demi", "Jack", "Cary", "Bill",
+]
+
+LAST_NAMES = [
+    "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller",
+    "Davis", "Rodriguez", "Martinez", "Hernandez", "Lopez", "Gonzalez",
+    "Wilson", "Anderson", "Taylor", "Moore", "Jackson", "Martin", "Lee",
+    "Bacon", "Hanks", "Cruise", "Field", "Sinise", "Wright", "Nicholson",
+    "Paxton", "Elwes", "Watson", "Hoffman", "Sarandon", "Golino", "Molen",
+]
+
+TITLE_WORDS = [
+    "Night", "Return", "Last", "City", "Love", "War", "Dark", "Blue", "Road",
+    "House", "Game", "Secret", "Summer", "Island", "River", "Star", "Man",
+    "Story", "Forrest", "Apollo", "Princess", "Rain", "Good", "Men",
+]
+
+
+def cast_size(rng, exponent, largest):
+    """
+    Draws a cast size from a discrete power law P(k) ~ k^-exponent,
+    k >= 1, truncated at `largest`.
+    """
+    while True:
+        size = int((1 - rng.random()) ** (-1 / (exponent - 1)))
+        if size <= largest:
+            return size
+
+
+def generate(directory, edges, seed=0, exponent=2.2, largest=100,
+             islands=0.02):
+    """
+    Writes people.csv, movies.csv and stars.csv with about `edges` star
+    rows to `directory`.
+
+    Cast sizes follow a power law and casts are drawn with Zipf-like
+    popularity, so a few prolific actors become hubs. A fraction
+    `islands` of the movies is cast from small groups of people who
+    appear in nothing else, giving disconnected components to query.
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+
+    # Roughly four credits per person on average, as in the IMDB data
+    people = max(10, edges // 4)
+    island_people = int(people * islands)
+    main_people = people - island_people
+    island_size = 5
+
+    # Popularity of person i is proportional to 1 / (i + 1) ** 0.8
+    cumulative = list(itertools.accumulate(
+        1 / (i + 1) ** 0.8 for i in range(main_people)
+    ))
+
+    with open(os.path.join(directory, "people.csv"), "w",
+              encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "birth"])
+        order = list(range(people))
+        rng.shuffle(order)
+        for person in range(people):
+            name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+            if rng.random() < 0.5:
+                name += f" {order[person]}"
+            writer.writerow([person + 1, name, rng.randint(1900, 2005)])
+
+    with open(os.path.join(directory, "movies.csv"), "w",
+              encoding="utf-8", newline="") as movies_file, \
+            open(os.path.join(directory, "stars.csv"), "w",
+                 encoding="utf-8", newline="") as stars_file:
+        movies = csv.writer(movies_file)
+        stars = csv.writer(stars_file)
+        movies.writerow(["id", "title", "year"])
+        stars.writerow(["person_id", "movie_id"])
+
+        movie = 0
+        written = 0
+        while written < edges:
+            movie += 1
+            title = " ".join(rng.sample(TITLE_WORDS, rng.randint(1, 3)))
+            movies.writerow([movie, f"{title} {movie}", rng.randint(1930, 2020)])
+
+            if island_people and rng.random() < islands:
+                group = rng.randrange(max(1, island_people // island_size))
+                first = main_people + group * island_size
+                group_people = range(first, min(first + island_size, people))
+                cast = set(rng.sample(group_people,
+                                      rng.randint(1, len(group_people))))
+            else:
+                size = min(cast_size(rng, exponent, largest), main_people)
+                cast = set()
+                while len(cast) < size:
+                    cast.update(rng.choices(range(main_people),
+                                            cum_weights=cumulative,
+                                            k=size - len(cast)))
+
+            for person in cast:
+                stars.writerow([person + 1, movie])
+            written += len(cast)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate a synthetic IMDB-like dataset for degrees.py."
+    )
+    parser.add_argument("directory")
+    parser.add_argument("--edges", type=int, default=100000,
+                        help="approximate number of stars.csv rows")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--exponent", type=float, default=2.2,
+                        help="power-law exponent of cast sizes")
+    args = parser.parse_args()
+
+    generate(args.directory, args.edges, args.seed, args.exponent)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+import csv
+from array import array
+from bisect import bisect_left, bisect_right
+
+
+class StringTable():
+    """
+    A list of strings packed into one UTF-8 buffer and addressed by index.
+
+    `offsets` holds len + 1 byte positions into `data`. If `order` is
+    given it lists the indices sorted by string value (lowercased when
+    `lower` is set), which lets `find` binary search the table.
+    """
+
+    def __init__(self, data, offsets, order=None, lower=False):
+        self.data = data
+        self.offsets = offsets
+        self.order = order
+        self.lower = lower
+
+    @classmethod
+    def from_strings(cls, strings, sort=False, lower=False):
+        data = bytearray()
+        offsets = array("q", [0])
+        for string in strings:
+            data += string.encode("utf-8")
+            offsets.append(len(data))
+        table = cls(bytes(data), offsets, lower=lower)
+        if sort:
+            table.order = array("i", sorted(range(len(table)), key=table.key))
+        return table
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return str(self.data[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+    def key(self, i):
+        return self[i].lower() if self.lower else self[i]
+
+    def find(self, value):
+        """
+        Returns the indices of all strings equal to `value`.
+        """
+        if self.lower:
+            value = value.lower()
+        low = bisect_left(self.order, value, key=self.key)
+        high = bisect_right(self.order, value, lo=low, key=self.key)
+        return list(self.order[low:high])
+
+
+class Graph():
+    """
+    People and movies with dense integer ids.
+
+    Person p starred in person_movies[person_offsets[p]:person_offsets[p + 1]]
+    and movie m starred movie_people[movie_offsets[m]:movie_offsets[m + 1]],
+    i.e. the bipartite star graph is stored in compressed sparse row form
+    in both directions. components[p] labels the connected component
+    person p belongs to.
+    """
+
+    # Field name and whether it is a StringTable, in snapshot order
+    FIELDS = [
+        ("person_ids", True), ("names", True), ("births", True),
+        ("movie_ids", True), ("titles", True), ("years", True),
+        ("person_offsets", False), ("person_movies", False),
+        ("movie_offsets", False), ("movie_people", False),
+        ("components", False),
+    ]
+
+    def __init__(self, person_ids, names, births, movie_ids, titles, years,
+                 person_offsets, person_movies, movie_offsets, movie_people,
+                 components=None):
+        self.person_ids = person_ids
+        self.names = names
+        self.births = births
+        self.movie_ids = movie_ids
+        self.titles = titles
+        self.years = years
+        self.person_offsets = person_offsets
+        self.person_movies = person_movies
+        self.movie_offsets = movie_offsets
+        self.movie_people = movie_people
+        self.components = components
+
+    @classmethod
+    def from_csv(cls, directory):
+        """
+        Builds a graph straight from the CSV files in `directory`,
+        without going through the `people` and `movies` dictionaries.
+        """
+        people = {}
+        person_ids, names, births = [], [], []
+        with open(f"{directory}/people.csv", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                people[row["id"]] = len(person_ids)
+                person_ids.append(row["id"])
+                names.append(row["name"])
+                births.append(row["birth"])
+
+        movies = {}
+        movie_ids, titles, years = [], [], []
+        with open(f"{directory}/movies.csv", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                movies[row["id"]] = len(movie_ids)
+                movie_ids.append(row["id"])
+                titles.append(row["title"])
+                years.append(row["year"])
+
+        stars_people, stars_movies = array("i"), array("i")
+        with open(f"{directory}/stars.csv", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                person = people.get(row["person_id"])
+                movie = movies.get(row["movie_id"])
+                if person is None or movie is None:
+                    continue
+                stars_people.append(person)
+                stars_movies.append(movie)
+
+        person_offsets, person_movies = compress(
+            stars_people, stars_movies, len(person_ids)
+        )
+        movie_offsets, movie_people = compress(
+            stars_movies, stars_people, len(movie_ids)
+        )
+        graph = cls(
+            StringTable.from_strings(person_ids, sort=True),
+            StringTable.from_strings(names, sort=True, lower=True),
+            StringTable.from_strings(births),
+            StringTable.from_strings(movie_ids, sort=True),
+            StringTable.from_strings(titles),
+            StringTable.from_strings(years),
+            person_offsets, person_movies, movie_offsets, movie_people
+        )
+        graph.components = graph.label_components()
+        return graph
+
+    def arrays(self):
+        """
+        Returns the graph as a dictionary of named flat arrays,
+        as stored in a snapshot.
+        """
+        arrays = {}
+        for field, strings in self.FIELDS:
+            value = getattr(self, field)
+            if not strings:
+                arrays[field] = value
+                continue
+            arrays[f"{field}.data"] = value.data
+            arrays[f"{field}.offsets"] = value.offsets
+            if value.order is not None:
+                arrays[f"{field}.order"] = value.order
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """
+        Rebuilds a graph from the output of `arrays`, which may be
+        memoryviews over a memory-mapped snapshot.
+        """
+        values = []
+        for field, strings in cls.FIELDS:
+            if not strings:
+                values.append(arrays[field])
+                continue
+            values.append(StringTable(
+                arrays[f"{field}.data"], arrays[f"{field}.offsets"],
+                arrays.get(f"{field}.order"), lower=(field == "names")
+            ))
+        return cls(*values)
+
+    def person_count(self):
+        return len(self.person_offsets) - 1
+
+    def movie_count(self):
+        return len(self.movie_offsets) - 1
+
+    def person_index(self, person_id):
+        """
+        Returns the integer index for an IMDB person id, or None.
+        """
+        found = self.person_ids.find(person_id)
+        return found[0] if found else None
+
+    def movie_index(self, movie_id):
+        found = self.movie_ids.find(movie_id)
+        return found[0] if found else None
+
+    def people_named(self, name):
+        """
+        Returns the indices of everyone whose name matches `name`,
+        ignoring case.
+        """
+        return self.names.find(name)
+
+    def movies_for(self, person):
+        return self.person_movies[
+            self.person_offsets[person]:self.person_offsets[person + 1]
+        ]
+
+    def stars_for(self, movie):
+        return self.movie_people[
+            self.movie_offsets[movie]:self.movie_offsets[movie + 1]
+        ]
+
+    def label_components(self):
+        """
+        Returns an array labelling each person with the connected
+        component they belong to, found by breadth-first search.
+        """
+        components = array("i", [-1]) * self.person_count()
+        seen_movies = bytearray(self.movie_count())
+        label = 0
+        for start in range(self.person_count()):
+            if components[start] != -1:
+                continue
+            components[start] = label
+            frontier = [start]
+            while frontier:
+                person = frontier.pop()
+                for movie in self.movies_for(person):
+                    if seen_movies[movie]:
+                        continue
+                    seen_movies[movie] = 1
+                    for other in self.stars_for(movie):
+                        if components[other] == -1:
+                            components[other] = label
+                            frontier.append(other)
+            label += 1
+        return components
+
+    def connected(self, source, target):
+        return self.components[source] == self.components[target]
+
+    def costars(self, person):
+        """
+        Returns (movie, person) index pairs with one entry per co-star of
+        `person`, giving the first movie (by index) they starred in together.
+        """
+        first = {}
+        for movie in self.movies_for(person):
+            for other in self.stars_for(movie):
+                if other not in first:
+                    first[other] = movie
+        first.pop(person, None)
+        return tuple((movie, other) for other, movie in first.items())
+
+    def neighbors(self, person):
+        """
+        Returns (movie, person) index pairs for everyone who starred
+        with `person`, including `person` itself.
+        """
+        movie_offsets, movie_people = self.movie_offsets, self.movie_people
+        return [
+            (movie, other)
+            for movie in self.movies_for(person)
+            for other in movie_people[movie_offsets[movie]:movie_offsets[movie + 1]]
+        ]
+
+
+def compress(rows, columns, count):
+    """
+    Returns CSR (offsets, indices) arrays for the edges rows[i] -> columns[i]
+    over `count` rows, with each row's columns sorted and de-duplicated.
+    """
+    offsets = array("q", bytes(8 * (count + 1)))
+    for row in rows:
+        offsets[row + 1] += 1
+    for row in range(count):
+        offsets[row + 1] += offsets[row]
+
+    indices = array("i", bytes(4 * len(rows)))
+    position = array("q", offsets)
+    for row, column in zip(rows, columns):
+        indices[position[row]] = column
+        position[row] += 1
+
+    # Drop repeated rows from stars.csv, as the set-based loader does
+    unique = array("i")
+    start = 0
+    for row in range(count):
+        end = offsets[row + 1]
+        unique.extend(sorted(set(indices[start:end])))
+        start = end
+        offsets[row + 1] = len(unique)
+    return offsets, unique
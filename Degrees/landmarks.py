@@ -0,0 +1,135 @@
+import argparse
+import math
+import os
+from array import array
+
+from snapshot import load_graph, read_arrays, sources, write_arrays
+
+# Landmark index, written next to the CSV files
+LANDMARKS = "degrees.landmarks"
+
+# Distance stored for people a landmark cannot reach
+UNREACHABLE = 255
+
+
+class LandmarkIndex():
+    """
+    Breadth-first distances from a few landmark people to everyone.
+
+    distances[l * n + p] is the number of degrees between landmark l and
+    person p, for n people. By the triangle inequality
+    |d(l, p) - d(l, t)| never overestimates d(p, t), so the largest such
+    difference over all landmarks is an admissible A* heuristic.
+    """
+
+    def __init__(self, landmarks, distances):
+        self.landmarks = landmarks
+        self.distances = distances
+        self.count = len(distances) // len(landmarks) if landmarks else 0
+
+    @classmethod
+    def build(cls, graph, count=8):
+        """
+        Picks the `count` people with the most movies as landmarks and
+        runs a breadth-first search from each of them.
+        """
+        people = range(graph.person_count())
+        landmarks = sorted(
+            people,
+            key=lambda p: graph.person_offsets[p + 1] - graph.person_offsets[p],
+            reverse=True
+        )[:count]
+        distances = array("B")
+        for landmark in landmarks:
+            distances.extend(distances_from(graph, landmark))
+        return cls(array("i", landmarks), distances)
+
+    def arrays(self):
+        return {"landmarks": self.landmarks, "distances": self.distances}
+
+    def heuristic(self, target):
+        """
+        Returns a function giving a lower bound on the degrees between
+        a person and `target`, or infinity if landmark distances show
+        the two are not connected.
+        """
+        n, distances = self.count, self.distances
+        bounds = [
+            (l * n, distances[l * n + target])
+            for l in range(len(self.landmarks))
+        ]
+
+        def bound(person):
+            best = 0
+            for offset, to_target in bounds:
+                to_person = distances[offset + person]
+                if to_person == UNREACHABLE or to_target == UNREACHABLE:
+                    if to_person != to_target:
+                        return math.inf
+                    continue
+                difference = abs(to_person - to_target)
+                if difference > best:
+                    best = difference
+            return best
+
+        return bound
+
+
+def distances_from(graph, source):
+    """
+    Returns an array of the degrees between `source` and every person,
+    visiting each movie only once.
+    """
+    distances = array("B", [UNREACHABLE]) * graph.person_count()
+    seen_movies = bytearray(graph.movie_count())
+    distances[source] = 0
+    frontier = [source]
+    depth = 0
+    while frontier:
+        depth += 1
+        next_frontier = []
+        for person in frontier:
+            for movie in graph.movies_for(person):
+                if seen_movies[movie]:
+                    continue
+                seen_movies[movie] = 1
+                for other in graph.stars_for(movie):
+                    if distances[other] == UNREACHABLE:
+                        distances[other] = min(depth, UNREACHABLE - 1)
+                        next_frontier.append(other)
+        frontier = next_frontier
+    return distances
+
+
+def load_landmarks(directory):
+    """
+    Returns the LandmarkIndex stored next to the dataset in `directory`,
+    or None if there is none or it is out of date.
+    """
+    arrays = read_arrays(os.path.join(directory, LANDMARKS), sources(directory))
+    if arrays is None:
+        return None
+    return LandmarkIndex(arrays["landmarks"], arrays["distances"])
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build the landmark index used for A* queries."
+    )
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--count", type=int, default=8,
+                        help="number of landmark people")
+    args = parser.parse_args()
+
+    print("Loading data...")
+    graph = load_graph(args.directory)
+    print("Building landmark index...")
+    index = LandmarkIndex.build(graph, args.count)
+    write_arrays(os.path.join(args.directory, LANDMARKS), index.arrays(),
+                 sources(args.directory))
+    for landmark in index.landmarks:
+        print(f"  {graph.names[landmark]} ({graph.person_ids[landmark]})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+
+from degrees import read_pairs
+
+
+async def client(pairs, latencies, connect):
+    """
+    Sends path requests for `pairs` one after another over a single
+    connection, recording each round-trip time in `latencies`.
+    """
+    reader, writer = await connect()
+    for source, target in pairs:
+        request = {"op": "path", "source": source, "target": target}
+        start = time.perf_counter()
+        writer.write(json.dumps(request).encode("utf-8") + b"\n")
+        await writer.drain()
+        json.loads(await reader.readline())
+        latencies.append(1000 * (time.perf_counter() - start))
+    writer.close()
+    await writer.wait_closed()
+
+
+async def run(pairs, connections, requests, connect):
+    rng = random.Random(0)
+    chosen = [rng.choice(pairs) for _ in range(requests)]
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        client(itertools.islice(chosen, i, None, connections), latencies, connect)
+        for i in range(connections)
+    ))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"{len(latencies)} requests over {connections} connections "
+          f"in {elapsed:.2f}s ({len(latencies) / elapsed:.0f} requests/s)")
+    for label, fraction in [("p50", 0.5), ("p90", 0.9), ("p99", 0.99)]:
+        index = min(len(latencies) - 1, int(fraction * len(latencies)))
+        print(f"  {label}: {latencies[index]:.2f} ms")
+    print(f"  max: {latencies[-1]:.2f} ms")
+
+    reader, writer = await connect()
+    writer.write(b'{"op": "stats"}\n')
+    await writer.drain()
+    print(f"Server stats: {json.loads(await reader.readline())}")
+    writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Load-test a running server.py with path requests."
+    )
+    parser.add_argument("pairs", help="CSV file of source,target pairs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--socket", metavar="PATH")
+    parser.add_argument("--connections", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=1000,
+                        help="total requests, drawn at random from the pairs")
+    args = parser.parse_args()
+
+    with open(args.pairs, encoding="utf-8") as f:
+        pairs = list(read_pairs(f))
+
+    if args.socket is not None:
+        def connect():
+            return asyncio.open_unix_connection(args.socket)
+    else:
+        def connect():
+            return asyncio.open_connection(args.host, args.port)
+
+    asyncio.run(run(pairs, args.connections, args.requests, connect))
+
+
+if __name__ == "__main__":
+    main()
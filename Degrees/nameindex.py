@@ -0,0 +1,133 @@
+import math
+from array import array
+from bisect import bisect_left
+from collections import Counter
+
+
+def fold(name):
+    """
+    Returns the form names are compared in: lowercase, single spaces.
+    """
+    return " ".join(name.lower().split())
+
+
+def trigrams(folded):
+    padded = f"  {folded} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class NameIndex():
+    """
+    Exact, prefix and typo-tolerant lookups over a list of names.
+
+    Names are kept folded and sorted for exact and prefix matches. For
+    fuzzy matches, scored by the Jaccard similarity of the two trigram
+    sets, every name is listed under each of its trigrams together with
+    its number of trigrams, so that lookups only visit names of a
+    length that could possibly match.
+    """
+
+    def __init__(self, entries):
+        """
+        Builds the index from (key, name) pairs; lookups return the keys.
+        """
+        self.keys = []
+        self.names = []
+        # Maps (trigram, size) to the entries, in order, of that many
+        # trigrams containing it
+        self.postings = {}
+        for key, name in entries:
+            entry = len(self.keys)
+            self.keys.append(key)
+            self.names.append(fold(name))
+            grams = trigrams(self.names[entry])
+            for trigram in grams:
+                postings = self.postings.get((trigram, len(grams)))
+                if postings is None:
+                    postings = self.postings[trigram, len(grams)] = array("i")
+                postings.append(entry)
+        self.order = sorted(range(len(self.names)), key=self.names.__getitem__)
+        self.sorted_names = [self.names[entry] for entry in self.order]
+
+    def prefixed(self, folded, limit=None):
+        """
+        Returns the entries whose folded name starts with `folded`,
+        in name order.
+        """
+        found = []
+        i = bisect_left(self.sorted_names, folded)
+        while i < len(self.sorted_names) and (limit is None or len(found) < limit):
+            name = self.sorted_names[i]
+            if not name.startswith(folded):
+                break
+            found.append(self.order[i])
+            i += 1
+        return found
+
+    def similar(self, folded, threshold):
+        """
+        Returns (similarity, entry) for every entry whose trigram Jaccard
+        similarity to `folded` is at least `threshold`.
+
+        A query of |q| trigrams can only match names of between
+        threshold * |q| and |q| / threshold trigrams, and a name of s
+        trigrams must share at least ceil(threshold * (|q| + s) /
+        (1 + threshold)) of them. For each such s, candidates are counted
+        from the postings of all but that many - 1 of the query's
+        trigrams, rarest first; the other postings are then intersected
+        with the candidates, or binary searched for them when long.
+        """
+        query = trigrams(folded)
+        size = len(query)
+        found = []
+        # Bounds are nudged so that float error never excludes a match
+        for other in range(math.ceil(threshold * size - 1e-9),
+                           math.floor(size / threshold + 1e-9) + 1):
+            needed = max(1, math.ceil(threshold * (size + other)
+                                      / (1 + threshold) - 1e-9))
+            if needed > min(size, other):
+                continue
+            lists = sorted((self.postings.get((trigram, other), ())
+                            for trigram in query), key=len)
+            scanned = size - needed + 1
+            counts = Counter()
+            for postings in lists[:scanned]:
+                counts.update(postings)
+
+            # The other postings only add to candidates found so far
+            candidates = set(counts)
+            for postings in lists[scanned:]:
+                if len(postings) <= 16 * len(candidates):
+                    counts.update(candidates.intersection(postings))
+                    continue
+                for entry in candidates:
+                    j = bisect_left(postings, entry)
+                    if j < len(postings) and postings[j] == entry:
+                        counts[entry] += 1
+
+            for entry, shared in counts.items():
+                if shared >= needed:
+                    similarity = shared / (size + other - shared)
+                    if similarity >= threshold:
+                        found.append((similarity, entry))
+        return found
+
+    def lookup(self, query, limit=10, threshold=0.4):
+        """
+        Returns up to `limit` (key, score) pairs for `query`, best first.
+
+        Exact matches score 1, other names starting with the query
+        score 0.9 and typo-tolerant matches score their trigram
+        similarity (at least `threshold`, and below 0.9).
+        """
+        folded = fold(query)
+        scores = {}
+        for entry in self.prefixed(folded, limit=limit):
+            scores[entry] = 1.0 if self.names[entry] == folded else 0.9
+        if len(scores) < limit:
+            for similarity, entry in self.similar(folded, threshold):
+                if entry not in scores:
+                    scores[entry] = min(similarity, 0.89)
+
+        ranked = sorted(scores, key=lambda e: (-scores[e], self.names[e]))
+        return [(self.keys[entry], scores[entry]) for entry in ranked[:limit]]
@@ -0,0 +1,136 @@
+import argparse
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import degrees
+from util import LRUCache
+
+
+class QueryServer():
+    """
+    Answers JSON-lines requests against the graph loaded in `degrees`.
+
+    Each request is one JSON object per line and gets one JSON object
+    back, echoing any "id" it carried:
+
+        {"op": "path", "source": NAME_OR_ID, "target": NAME_OR_ID}
+        {"op": "lookup", "query": TEXT, "limit": 10}
+        {"op": "stats"}
+
+    Connections are served concurrently. Searches run one at a time on
+    a worker thread, so the event loop keeps answering lookups and
+    cached paths while a long search is in progress.
+    """
+
+    def __init__(self, cache_size=10000):
+        self.results = LRUCache(cache_size)
+        self.searches = ThreadPoolExecutor(max_workers=1)
+        self.requests = 0
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                request = None
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("expected a JSON object")
+                    response = await self.answer(request)
+                except (ValueError, KeyError, TypeError) as e:
+                    response = {"error": f"bad request: {e}"}
+                except Exception as e:
+                    # One failed request must not drop the connection
+                    response = {"error": f"request failed: {e!r}"}
+                if isinstance(request, dict) and "id" in request:
+                    response["id"] = request["id"]
+                writer.write(json.dumps(response).encode("utf-8") + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def answer(self, request):
+        self.requests += 1
+        op = request.get("op", "path")
+        if op == "path":
+            key = (person_key(request, "source"),
+                   person_key(request, "target"))
+            result = self.results.get(key)
+            if result is None:
+                loop = asyncio.get_running_loop()
+                result = await loop.run_in_executor(
+                    self.searches, degrees.batch_query, key
+                )
+                self.results.put(key, result)
+            return dict(result)
+        if op == "lookup":
+            limit = int(request.get("limit", 10))
+            return {"candidates": degrees.lookup_people(request["query"], limit)}
+        if op == "stats":
+            stats = {"requests": self.requests, "results": self.results.info()}
+            if degrees.costar_cache is not None:
+                stats["costars"] = degrees.costar_cache.info()
+            return stats
+        raise ValueError(f"unknown op {op!r}")
+
+
+def person_key(request, field):
+    """
+    Returns the name or id in `request[field]` as a stripped string;
+    ids may also be sent as JSON integers.
+    """
+    value = request[field]
+    if isinstance(value, int) and not isinstance(value, bool):
+        return str(value)
+    if not isinstance(value, str):
+        raise TypeError(f"{field} must be a name or id")
+    return value.strip()
+
+
+async def serve(server, host, port, path):
+    if path is not None:
+        listener = await asyncio.start_unix_server(server.handle, path=path)
+        print(f"Listening on {path}")
+    else:
+        listener = await asyncio.start_server(server.handle, host, port)
+        print(f"Listening on {host}:{port}")
+    async with listener:
+        await listener.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serve shortest-path and name queries over a socket."
+    )
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--compact", action="store_true")
+    parser.add_argument("--no-cache", dest="cache", action="store_false")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--socket", metavar="PATH",
+                        help="listen on a Unix socket instead of TCP")
+    parser.add_argument("--cache-size", type=int, default=10000,
+                        help="recent (source, target) results to keep")
+    parser.add_argument("--costar-cache", type=int, default=0, metavar="N")
+    args = parser.parse_args()
+
+    print("Loading data...")
+    degrees.load_data(args.directory, compact=args.compact, cache=args.cache)
+    degrees.enable_costar_cache(args.costar_cache)
+    degrees.name_index()
+    print("Data loaded.")
+
+    try:
+        asyncio.run(serve(QueryServer(args.cache_size),
+                          args.host, args.port, args.socket))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import json
+import mmap
+import os
+import struct
+import sys
+
+from graph import Graph
+
+# Snapshot of the loaded graph, written next to the CSV files
+SNAPSHOT = "degrees.snapshot"
+
+# Files a snapshot is derived from; any change to them invalidates it
+SOURCES = ["people.csv", "movies.csv", "stars.csv"]
+
+MAGIC = b"DEGSNAP2"
+
+
+def sources(directory, filenames=SOURCES):
+    """
+    Returns the modification time and size of each source file,
+    which a snapshot must match to be valid.
+    """
+    stamps = {}
+    for filename in filenames:
+        stat = os.stat(os.path.join(directory, filename))
+        stamps[filename] = [stat.st_mtime_ns, stat.st_size]
+    return stamps
+
+
+def write_arrays(path, arrays, stamps):
+    """
+    Writes named flat arrays to `path`, together with the source file
+    stamps they were built from.
+
+    The file is a magic string, a JSON header giving the type code,
+    offset and length of every array, then the raw arrays aligned to
+    8 bytes. It is written to a temporary file and renamed into place.
+    """
+    header = {"byteorder": sys.byteorder, "sources": stamps, "arrays": {}}
+    offset = 0
+    for name, values in arrays.items():
+        values = memoryview(values)
+        header["arrays"][name] = [values.format, offset, values.nbytes]
+        offset += -(-values.nbytes // 8) * 8
+
+    encoded = json.dumps(header).encode("utf-8")
+    start = len(MAGIC) + 8 + len(encoded)
+    start += -start % 8
+
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(encoded)))
+        f.write(encoded)
+        f.write(bytes(start - f.tell()))
+        for values in arrays.values():
+            data = memoryview(values).cast("B")
+            f.write(data)
+            f.write(bytes(-len(data) % 8))
+    os.replace(temporary, path)
+
+
+def read_arrays(path, stamps):
+    """
+    Memory-maps a file written by `write_arrays` and returns its arrays
+    as memoryviews, or None if it is missing, unreadable or was built
+    from source files that have since changed.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    if data[:len(MAGIC)] != MAGIC:
+        return None
+    length, = struct.unpack_from("<Q", data, len(MAGIC))
+    start = len(MAGIC) + 8
+    try:
+        header = json.loads(bytes(data[start:start + length]))
+    except ValueError:
+        return None
+    if header["byteorder"] != sys.byteorder or header["sources"] != stamps:
+        return None
+    start += length
+    start += -start % 8
+
+    view = memoryview(data)
+    arrays = {}
+    for name, (typecode, offset, size) in header["arrays"].items():
+        begin = start + offset
+        arrays[name] = view[begin:begin + size].cast(typecode)
+    return arrays
+
+
+def load_graph(directory, cache=True):
+    """
+    Returns the Graph for the dataset in `directory`.
+
+    If `cache` is set, a valid snapshot is memory-mapped instead of
+    parsing the CSV files; otherwise the graph is built from the CSV
+    files and a fresh snapshot is written for next time.
+    """
+    path = os.path.join(directory, SNAPSHOT)
+    stamps = sources(directory)
+    if cache:
+        arrays = read_arrays(path, stamps)
+        if arrays is not None:
+            return Graph.from_arrays(arrays)
+
+    graph = Graph.from_csv(directory)
+    if cache:
+        try:
+            write_arrays(path, graph.arrays(), stamps)
+        except OSError:
+            pass
+    return graph
+
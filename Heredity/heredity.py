@@ -1,6 +1,8 @@
+import argparse
 import csv
 import itertools
-import sys
+
+from inference import infer
 
 PROBS = {
 
@@ -39,10 +41,38 @@ PROBS = {
 
 def main():
 
-    # Check for proper usage
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python heredity.py data.csv")
-    people = load_data(sys.argv[1])
+    parser = argparse.ArgumentParser()
+    parser.add_argument("data", help="CSV file of name, mother, father, trait")
+    parser.add_argument("--enumerate", action="store_true",
+                        help="sum the joint probability of every assignment "
+                             "instead of using variable elimination")
+    args = parser.parse_args()
+    people = load_data(args.data)
+
+    if args.enumerate:
+        probabilities = enumerate_probabilities(people)
+    else:
+        probabilities = infer(people, PROBS)
+
+    # Ensure probabilities sum to 1
+    normalize(probabilities)
+
+    # Print results
+    for person in people:
+        print(f"{person}:")
+        for field in probabilities[person]:
+            print(f"  {field.capitalize()}:")
+            for value in probabilities[person][field]:
+                p = probabilities[person][field][value]
+                print(f"    {value}: {p:.4f}")
+
+
+def enumerate_probabilities(people):
+    """
+    Return gene and trait probabilities for each person by summing the
+    joint probability of every assignment of genes and traits that is
+    consistent with the known traits.
+    """
 
     # Keep track of gene and trait probabilities for each person
     probabilities = {
@@ -81,17 +111,7 @@ def main():
                 p = joint_probability(people, one_gene, two_genes, have_trait)
                 update(probabilities, one_gene, two_genes, have_trait, p)
 
-    # Ensure probabilities sum to 1
-    normalize(probabilities)
-
-    # Print results
-    for person in people:
-        print(f"{person}:")
-        for field in probabilities[person]:
-            print(f"  {field.capitalize()}:")
-            for value in probabilities[person][field]:
-                p = probabilities[person][field][value]
-                print(f"    {value}: {p:.4f}")
+    return probabilities
 
 
 def load_data(filename):
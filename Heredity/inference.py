@@ -0,0 +1,274 @@
+import itertools
+from operator import itemgetter
+
+# Possible numbers of copies of the gene
+GENES = (2, 1, 0)
+
+
+class Factor():
+    """
+    A table over the gene counts of some people.
+
+    table[values] is the factor's value when variables[i] has values[i]
+    copies of the gene, for every combination of values in GENES.
+    """
+
+    def __init__(self, variables, table):
+        self.variables = tuple(variables)
+        self.table = table
+
+    @classmethod
+    def from_function(cls, variables, function):
+        """
+        Builds the factor whose value for each combination of gene
+        counts is function(*values).
+        """
+        return cls(variables, {
+            values: function(*values)
+            for values in itertools.product(GENES, repeat=len(variables))
+        })
+
+    def multiply(self, other):
+        """
+        Returns the product of two factors, over the union of their
+        variables.
+        """
+        variables = self.variables + tuple(
+            variable for variable in other.variables
+            if variable not in self.variables
+        )
+        position = {variable: i for i, variable in enumerate(variables)}
+        theirs = projection([position[variable]
+                             for variable in other.variables])
+
+        # Our variables come first, so each of our entries is extended
+        # with every combination of the other factor's new variables
+        extra = len(variables) - len(self.variables)
+        table = {}
+        for values, p in self.table.items():
+            for rest in itertools.product(GENES, repeat=extra):
+                values_rest = values + rest
+                table[values_rest] = p * other.table[theirs(values_rest)]
+        return Factor(variables, table)
+
+    def sum_out(self, variable):
+        """
+        Returns the factor with `variable` summed out.
+        """
+        i = self.variables.index(variable)
+        table = {}
+        for values, p in self.table.items():
+            rest = values[:i] + values[i + 1:]
+            table[rest] = table.get(rest, 0) + p
+        return Factor(self.variables[:i] + self.variables[i + 1:], table)
+
+    def keep(self, variables):
+        """
+        Returns the factor with every variable not in `variables`
+        summed out.
+        """
+        factor = self
+        for variable in self.variables:
+            if variable not in variables:
+                factor = factor.sum_out(variable)
+        return factor
+
+
+def product(factors):
+    """
+    Returns the product of a list of factors, starting from the largest
+    so that most products only look up entries of the smaller factor.
+    """
+    result = Factor((), {(): 1})
+    for factor in sorted(factors, key=lambda f: len(f.variables),
+                         reverse=True):
+        result = result.multiply(factor)
+    return result
+
+
+def projection(positions):
+    """
+    Returns a function picking the values at `positions` out of a tuple,
+    always as a tuple.
+    """
+    if len(positions) == 1:
+        i, = positions
+        return lambda values: (values[i],)
+    if not positions:
+        return lambda values: ()
+    return itemgetter(*positions)
+
+
+def passing(genes, probs):
+    """
+    Returns the probability that a parent with `genes` copies of the gene
+    passes one on to a child, or that an unknown parent does (None).
+    """
+    if genes is None:
+        return 0.5
+    if genes == 2:
+        return 1 - probs["mutation"]
+    if genes == 1:
+        return 0.5
+    return probs["mutation"]
+
+
+def child_gene(genes, mother, father, probs):
+    """
+    Returns the probability that a child of parents with `mother` and
+    `father` copies of the gene (None if unknown) has `genes` copies.
+    """
+    from_mother = passing(mother, probs)
+    from_father = passing(father, probs)
+    if genes == 2:
+        return from_mother * from_father
+    if genes == 1:
+        return (from_mother * (1 - from_father)
+                + (1 - from_mother) * from_father)
+    return (1 - from_mother) * (1 - from_father)
+
+
+def gene_factors(people, probs):
+    """
+    Returns one factor per person: the probability of their gene count
+    given their parents' (or unconditionally, for people without
+    parents in the data), times the probability of their trait if it
+    is known.
+
+    Unknown traits sum to 1 whatever the gene count, so they need no
+    variables of their own.
+    """
+    factors = []
+    for person, data in people.items():
+        trait = data["trait"]
+        parents = [parent for parent in (data["mother"], data["father"])
+                   if parent is not None]
+
+        def evidence(genes):
+            return 1 if trait is None else probs["trait"][genes][trait]
+
+        if not parents:
+            factor = Factor.from_function(
+                (person,),
+                lambda genes: probs["gene"][genes] * evidence(genes)
+            )
+        elif data["mother"] is not None and data["father"] is not None:
+            factor = Factor.from_function(
+                (person, data["mother"], data["father"]),
+                lambda genes, mother, father: (
+                    child_gene(genes, mother, father, probs)
+                    * evidence(genes)
+                )
+            )
+        else:
+            factor = Factor.from_function(
+                (person, parents[0]),
+                lambda genes, parent: (
+                    child_gene(genes, parent, None, probs) * evidence(genes)
+                )
+            )
+        factors.append(factor)
+    return factors
+
+
+def elimination_order(factors):
+    """
+    Returns an order in which to sum out every variable, choosing at
+    each step the variable whose elimination adds the fewest new edges
+    between variables that share a factor (ties broken by fewest
+    neighbours), which keeps the intermediate factors small.
+    """
+    neighbours = {}
+    for factor in factors:
+        for variable in factor.variables:
+            neighbours.setdefault(variable, set()).update(factor.variables)
+    for variable in neighbours:
+        neighbours[variable].discard(variable)
+
+    order = []
+    while neighbours:
+        def fill(variable):
+            adjacent = neighbours[variable]
+            missing = sum(1 for a, b in itertools.combinations(adjacent, 2)
+                          if b not in neighbours[a])
+            return missing, len(adjacent)
+
+        variable = min(neighbours, key=fill)
+        adjacent = neighbours.pop(variable)
+        for a in adjacent:
+            neighbours[a].discard(variable)
+            neighbours[a].update(adjacent - {a})
+        order.append(variable)
+    return order
+
+
+def gene_marginals(people, probs):
+    """
+    Returns {person: {genes: probability}} given the known traits.
+
+    Variables are summed out in `elimination_order`, and the factors
+    multiplied at each step form a cluster whose message, after the
+    variable is summed out, goes to the cluster that uses it. That is a
+    tree, so after this upward pass one downward pass sending messages
+    back gives every cluster's belief, and each person's marginal is
+    read off the cluster where their gene was eliminated. All marginals
+    therefore cost about two eliminations rather than one per person.
+    """
+    factors = gene_factors(people, probs)
+    order = elimination_order(factors)
+
+    # Eliminate, recording each cluster's own factors and children
+    pool = [(factor, None) for factor in factors]
+    local = []
+    children = []
+    upward = []
+    for i, variable in enumerate(order):
+        involved = [(f, origin) for f, origin in pool
+                    if variable in f.variables]
+        pool = [(f, origin) for f, origin in pool
+                if variable not in f.variables]
+        local.append([f for f, origin in involved if origin is None])
+        children.append([origin for _, origin in involved
+                         if origin is not None])
+        message = product(f for f, _ in involved).sum_out(variable)
+        upward.append(message)
+        pool.append((message, i))
+
+    # Send messages back down from each cluster to its children
+    downward = [Factor((), {(): 1})] * len(order)
+    marginals = {}
+    for i in reversed(range(len(order))):
+        for child in children[i]:
+            factors = local[i] + [downward[i]] + [
+                upward[other] for other in children[i] if other != child
+            ]
+            downward[child] = product(factors).keep(upward[child].variables)
+
+        belief = product(local[i] + [downward[i]]
+                         + [upward[child] for child in children[i]])
+        table = belief.keep((order[i],)).table
+        total = sum(table.values())
+        marginals[order[i]] = {genes: table[(genes,)] / total
+                               for genes in GENES}
+    return marginals
+
+
+def infer(people, probs):
+    """
+    Returns, for every person, the probability distributions of their
+    gene count and trait given the known traits, in the same form as
+    heredity.py's `probabilities`.
+    """
+    genes = gene_marginals(people, probs)
+    probabilities = {}
+    for person, data in people.items():
+        if data["trait"] is None:
+            has_trait = sum(genes[person][count] * probs["trait"][count][True]
+                            for count in GENES)
+        else:
+            has_trait = 1 if data["trait"] else 0
+        probabilities[person] = {
+            "gene": genes[person],
+            "trait": {True: has_trait, False: 1 - has_trait}
+        }
+    return probabilities
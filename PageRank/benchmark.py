@@ -0,0 +1,226 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import pagerank
+from edgelist import edge_list_from_corpus, edge_list_pagerank
+from linkgraph import LinkGraph, parallel_power_iteration, power_iteration
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Tolerance of the power iteration every engine is compared against
+REFERENCE_TOLERANCE = 1e-12
+
+# Engines written in plain Python, skipped by default on corpora with
+# more pages than PYTHON_PAGES since they take minutes per run there
+PYTHON_ENGINES = {"sample", "iterate", "gauss-seidel"}
+PYTHON_PAGES = 200000
+
+
+def peak_memory():
+    """
+    Returns the peak resident memory of this process in MB, or None
+    where the resource module is not available.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+def sampling(corpus, args):
+    random.seed(args.seed)
+    return pagerank.sample_pagerank(corpus, pagerank.DAMPING, args.samples)
+
+
+def walkers(corpus, args):
+    return pagerank.walker_pagerank(corpus, pagerank.DAMPING, args.samples,
+                                    seed=args.seed)
+
+
+def iteration(corpus, args):
+    return pagerank.iterate_pagerank(corpus, pagerank.DAMPING, norm="l1",
+                                     tolerance=args.tolerance)
+
+
+def gauss_seidel(corpus, args):
+    return pagerank.iterate_pagerank(corpus, pagerank.DAMPING,
+                                     method="gauss-seidel", norm="l1",
+                                     tolerance=args.tolerance)
+
+
+def matrix(corpus, args):
+    return pagerank.matrix_pagerank(corpus, pagerank.DAMPING, args.tolerance)
+
+
+def parallel(corpus, args):
+    return pagerank.parallel_pagerank(corpus, pagerank.DAMPING,
+                                      args.processes, args.tolerance)
+
+
+def edge_list(corpus, args):
+    with tempfile.TemporaryDirectory() as path:
+        edge_list_from_corpus(corpus, path)
+        return edge_list_pagerank(path, pagerank.DAMPING, args.tolerance)
+
+
+# Engines in the order they are run, named as on the command line
+ENGINES = {
+    "sample": sampling,
+    "walkers": walkers,
+    "iterate": iteration,
+    "gauss-seidel": gauss_seidel,
+    "matrix": matrix,
+    "parallel": parallel,
+    "edge-list": edge_list,
+}
+
+
+def core_counts(limit):
+    """
+    Returns 1, 2, 4, ... up to `limit`, always ending with `limit`.
+    """
+    counts = []
+    count = 1
+    while count < limit:
+        counts.append(count)
+        count *= 2
+    return counts + [limit]
+
+
+def time_best(function, repeat):
+    """
+    Returns the fastest of `repeat` runs of `function` in seconds,
+    together with its result.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def report_crawl(directory):
+    """
+    Prints how long crawling `directory` takes with every page parsed
+    and again from the crawl cache, and returns the corpus.
+    """
+    stats = {}
+    start = time.perf_counter()
+    corpus = pagerank.crawl(directory, cache=False)
+    elapsed = time.perf_counter() - start
+    print(f"Crawl: {elapsed:.3f}s for {len(corpus)} pages, "
+          f"{sum(map(len, corpus.values()))} links")
+
+    pagerank.crawl(directory)
+    start = time.perf_counter()
+    pagerank.crawl(directory, stats=stats)
+    elapsed = time.perf_counter() - start
+    print(f"Crawl from cache: {elapsed:.3f}s "
+          f"({stats['parsed']} pages parsed)")
+    return corpus
+
+
+def report_engines(corpus, engines, args):
+    """
+    Prints the time, peak memory so far and error against a tightly
+    converged reference solution of each engine in `engines`. Plain
+    Python engines are reported as skipped on corpora with more than
+    `args.python_pages` pages.
+    """
+    graph = LinkGraph.from_corpus(corpus)
+    reference = power_iteration(graph, pagerank.DAMPING, REFERENCE_TOLERANCE,
+                                max_iterations=10000)
+    print("Engine          time (s)  peak (MB)   max error    L1 error")
+    for name in engines:
+        if name in PYTHON_ENGINES and len(graph) > args.python_pages:
+            print(f"  {name:<13} skipped (more than {args.python_pages} "
+                  f"pages)")
+            continue
+        start = time.perf_counter()
+        ranks = ENGINES[name](corpus, args)
+        elapsed = time.perf_counter() - start
+        errors = np.abs(np.array([ranks[page] for page in graph.pages])
+                        - reference)
+        peak = peak_memory()
+        peak = "-" if peak is None else f"{peak:.1f}"
+        print(f"  {name:<13} {elapsed:>9.3f} {peak:>10} "
+              f"{errors.max():>11.2e} {errors.sum():>11.2e}")
+
+
+def report_scaling(graph, tolerance, processes, repeat):
+    """
+    Prints the time power iteration takes on `graph` in one process and
+    partitioned across each number of `processes`, with the speedup over
+    one process and the largest difference from its ranks.
+    """
+    serial, reference = time_best(
+        lambda: power_iteration(graph, pagerank.DAMPING, tolerance), repeat)
+    print("Processes     time (s)   speedup   max difference")
+    print(f"  {'serial':<10} {serial:>9.3f} {1:>9.2f}")
+    for count in processes:
+        elapsed, ranks = time_best(
+            lambda: parallel_power_iteration(graph, pagerank.DAMPING, count,
+                                             tolerance),
+            repeat)
+        difference = np.abs(ranks - reference).max()
+        print(f"  {count:<10} {elapsed:>9.3f} {serial / elapsed:>9.2f} "
+              f"{difference:>16.2e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure crawling and PageRank engines on a corpus."
+    )
+    parser.add_argument("corpus",
+                        help="corpus directory, e.g. one written by generate.py")
+    parser.add_argument("--engines", default=",".join(ENGINES),
+                        help="comma-separated engines to run "
+                             f"(default {','.join(ENGINES)})")
+    parser.add_argument("--tolerance", type=float, default=1e-6,
+                        help="L1 tolerance for the iterative engines")
+    parser.add_argument("--samples", type=int, default=pagerank.SAMPLES * 100,
+                        help="samples for the sampling engines")
+    parser.add_argument("--processes", type=int, default=os.cpu_count(),
+                        help="processes for the parallel engine, and the "
+                             "largest number tried with --scaling")
+    parser.add_argument("--python-pages", type=int, default=PYTHON_PAGES,
+                        help="skip the plain Python engines on corpora "
+                             "with more pages than this")
+    parser.add_argument("--scaling", action="store_true",
+                        help="also report parallel speedup by core count")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="keep the fastest of this many runs "
+                             "with --scaling")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    engines = [name for name in args.engines.split(",") if name]
+    for name in engines:
+        if name not in ENGINES:
+            parser.error(f"unknown engine {name!r}")
+
+    before = peak_memory()
+    corpus = report_crawl(args.corpus)
+    after = peak_memory()
+    if after is not None:
+        print(f"Peak memory: {after:.1f} MB ({after - before:+.1f} MB crawling)")
+
+    report_engines(corpus, engines, args)
+    if args.scaling:
+        report_scaling(LinkGraph.from_corpus(corpus), args.tolerance,
+                       core_counts(args.processes), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from linkgraph import power_iteration
+from pagerank import DAMPING, crawl, read_crawl_cache
+
+# An edge list is a directory holding these files
+HEADER = "edges.json"
+SOURCES = "src.i32"
+TARGETS = "dst.i32"
+DEGREES = "degree.i32"
+EDGE_LIST_VERSION = 1
+
+# Edges written, and read back on every iteration, this many at a time
+EDGE_BLOCK = 1 << 22
+
+# Page numbers are stored as little-endian int32 whatever the platform
+INT32 = np.dtype("<i4")
+
+
+class EdgeList():
+    """
+    A link graph stored on disk as two int32 arrays, src and dst, with
+    one entry per link, read through numpy.memmap.
+
+    Only the page names, the out-degree of every page and the rank
+    vectors are kept in memory. Each step of the random surfer streams
+    the links from disk in blocks of EDGE_BLOCK, so the graph may be far
+    larger than RAM. It has the same step, ranks and len as LinkGraph
+    and so can be passed to power_iteration.
+    """
+
+    def __init__(self, path, block=EDGE_BLOCK):
+        with open(os.path.join(path, HEADER), encoding="utf-8") as f:
+            header = json.load(f)
+        if header.get("version") != EDGE_LIST_VERSION:
+            raise ValueError(f"{path} is not a version "
+                             f"{EDGE_LIST_VERSION} edge list")
+        self.pages = header["pages"]
+        self.edges = header["edges"]
+        self.block = block
+        self.src = self.open(path, SOURCES, self.edges)
+        self.dst = self.open(path, TARGETS, self.edges)
+        self.out_degree = np.array(self.open(path, DEGREES, len(self.pages)),
+                                   dtype=np.int64)
+        self.dangling = self.out_degree == 0
+
+    @staticmethod
+    def open(path, filename, length):
+        """
+        Memory-maps `length` int32 values, or returns an empty array
+        since an empty file cannot be mapped.
+        """
+        if length == 0:
+            return np.zeros(0, dtype=INT32)
+        return np.memmap(os.path.join(path, filename), dtype=INT32,
+                         mode="r", shape=(length,))
+
+    def __len__(self):
+        return len(self.pages)
+
+    def spread(self, ranks):
+        """
+        Returns, for each page, the rank flowing into it along links when
+        every page splits its rank evenly over its outgoing links.
+        Rank on dangling pages is not spread.
+        """
+        n = len(self.pages)
+        share = np.divide(ranks, self.out_degree,
+                          out=np.zeros(n), where=~self.dangling)
+        flow = np.zeros(n)
+        for start in range(0, self.edges, self.block):
+            src = self.src[start:start + self.block]
+            dst = self.dst[start:start + self.block]
+            flow += np.bincount(dst, weights=share[src], minlength=n)
+        return flow
+
+    def step(self, ranks, damping_factor):
+        """
+        Returns the ranks after one step of the random surfer: follow a
+        link with probability `damping_factor`, otherwise jump to any
+        page. Dangling pages are treated as linking to every page.
+        """
+        n = len(self.pages)
+        dangling = ranks[self.dangling].sum()
+        return (damping_factor * (self.spread(ranks) + dangling / n)
+                + (1 - damping_factor) / n)
+
+    def ranks(self, values):
+        """
+        Returns a {page: rank} dictionary for an array of ranks.
+        """
+        return dict(zip(self.pages, values.tolist()))
+
+
+def write_edge_list(path, pages, links, block=EDGE_BLOCK):
+    """
+    Writes an edge list to the directory `path`.
+
+    `pages` lists every page and `links` yields (page, linked pages)
+    pairs; links to pages that are not in `pages` are ignored. Links
+    are written out every `block` edges, so only one block of them is
+    ever held in memory.
+    """
+    pages = sorted(pages)
+    index = {page: i for i, page in enumerate(pages)}
+    degrees = np.zeros(len(pages), dtype=INT32)
+    edges = 0
+    os.makedirs(path, exist_ok=True)
+
+    # The header is removed first and written last, so a half-written
+    # edge list never loads
+    header = os.path.join(path, HEADER)
+    try:
+        os.remove(header)
+    except FileNotFoundError:
+        pass
+    with open(os.path.join(path, SOURCES), "wb") as src, \
+            open(os.path.join(path, TARGETS), "wb") as dst:
+        sources, targets = [], []
+        for page, linked in links:
+            i = index[page]
+            found = sorted(index[link] for link in linked if link in index)
+            degrees[i] = len(found)
+            sources.extend([i] * len(found))
+            targets.extend(found)
+            if len(sources) >= block:
+                np.array(sources, dtype=INT32).tofile(src)
+                np.array(targets, dtype=INT32).tofile(dst)
+                edges += len(sources)
+                sources, targets = [], []
+        np.array(sources, dtype=INT32).tofile(src)
+        np.array(targets, dtype=INT32).tofile(dst)
+        edges += len(sources)
+    degrees.tofile(os.path.join(path, DEGREES))
+
+    temporary = f"{header}.{os.getpid()}.tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        json.dump({"version": EDGE_LIST_VERSION, "edges": edges,
+                   "pages": pages}, f)
+    os.replace(temporary, header)
+    return edges
+
+
+def edge_list_from_corpus(corpus, path):
+    """
+    Writes the {page: set of linked pages} `corpus` that `crawl` returns
+    as an edge list in `path`, and returns the number of links.
+    """
+    return write_edge_list(path, corpus, corpus.items())
+
+
+def edge_list_from_cache(directory, path):
+    """
+    Writes the corpus in `directory` as an edge list in `path`, straight
+    from the links saved in its crawl cache by the last crawl, and
+    returns the number of links. As in `crawl`, only links to other
+    pages in the corpus are kept.
+    """
+    files = read_crawl_cache(directory)
+    if not files:
+        raise ValueError(f"{directory} has no crawl cache")
+    links = ((filename, (link for link in entry[2] if link != filename))
+             for filename, entry in files.items())
+    return write_edge_list(path, files, links)
+
+
+def edge_list_pagerank(path, damping_factor, tolerance=1e-6, stats=None):
+    """
+    Return PageRank values for each page of the edge list in `path` by
+    power iteration, streaming its links from disk on every iteration,
+    until the L1 change between iterations is below `tolerance`.
+    """
+    graph = EdgeList(path)
+    return graph.ranks(power_iteration(graph, damping_factor, tolerance,
+                                       stats=stats))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Convert corpora to memory-mapped edge lists and rank them."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    convert = commands.add_parser("convert",
+                                  help="write a corpus as an edge list")
+    convert.add_argument("corpus")
+    convert.add_argument("path")
+    convert.add_argument("--from-cache", action="store_true",
+                         help="read links from the crawl cache instead of "
+                              "crawling")
+    rank = commands.add_parser("rank", help="rank an edge list")
+    rank.add_argument("path")
+    rank.add_argument("--tolerance", type=float, default=1e-6)
+    rank.add_argument("--top", type=int, default=0,
+                      help="only print this many highest ranked pages")
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        if args.from_cache:
+            edges = edge_list_from_cache(args.corpus, args.path)
+        else:
+            edges = edge_list_from_corpus(crawl(args.corpus), args.path)
+        print(f"Wrote {edges} links to {args.path}")
+        return
+
+    stats = {}
+    start = time.perf_counter()
+    ranks = edge_list_pagerank(args.path, DAMPING, args.tolerance, stats)
+    elapsed = time.perf_counter() - start
+    print(f"PageRank Results from Edge List ({stats['iterations']} "
+          f"iterations, {elapsed:.3f}s)")
+    pages = sorted(ranks)
+    if args.top:
+        pages = sorted(ranks, key=ranks.get, reverse=True)[:args.top]
+    for page in pages:
+        print(f"  {page}: {ranks[page]:.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import argparse
+import itertools
+import os
+import random
+
+PAGE = """<!DOCTYPE html>
+<html lang="en">
+    <head>
+        <title>{title}</title>
+    </head>
+    <body>
+        <h1>{title}</h1>
+{links}    </body>
+</html>
+"""
+
+LINK = '        <a href="{target}">{target}</a>\n'
+
+
+def out_degree(rng, exponent, largest):
+    """
+    Draws a number of links from a discrete power law P(k) ~ k^-exponent,
+    k >= 1, truncated at `largest`.
+    """
+    while True:
+        degree = int((1 - rng.random()) ** (-1 / (exponent - 1)))
+        if degree <= largest:
+            return degree
+
+
+def generate(directory, pages, seed=0, exponent=2.1, largest=1000,
+             dangling=0.05):
+    """
+    Writes `pages` HTML pages, 0.html to {pages - 1}.html, to `directory`.
+
+    Out-degrees follow a power law, and link targets are drawn with
+    Zipf-like popularity so that in-degrees follow a power law too and
+    a few pages become hubs. A fraction `dangling` of the pages has no
+    links at all, and links to the page itself are dropped.
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+
+    # Popularity of page i is proportional to 1 / (i + 1) ** 0.9, with
+    # the popular pages scattered over the file names
+    cumulative = list(itertools.accumulate(
+        1 / (i + 1) ** 0.9 for i in range(pages)
+    ))
+    names = list(range(pages))
+    rng.shuffle(names)
+
+    for page in range(pages):
+        targets = set()
+        if rng.random() >= dangling:
+            degree = min(out_degree(rng, exponent, largest), pages - 1)
+            for target in rng.choices(names, cum_weights=cumulative,
+                                      k=degree):
+                if target != page:
+                    targets.add(target)
+        links = "".join(LINK.format(target=f"{target}.html")
+                        for target in sorted(targets))
+        with open(os.path.join(directory, f"{page}.html"), "w") as f:
+            f.write(PAGE.format(title=f"Page {page}", links=links))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate a synthetic web-graph corpus for pagerank.py."
+    )
+    parser.add_argument("directory")
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--exponent", type=float, default=2.1,
+                        help="power-law exponent of out-degrees")
+    parser.add_argument("--dangling", type=float, default=0.05,
+                        help="fraction of pages without links")
+    args = parser.parse_args()
+
+    generate(args.directory, args.pages, args.seed, args.exponent,
+             dangling=args.dangling)
+
+
+if __name__ == "__main__":
+    main()
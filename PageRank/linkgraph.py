@@ -0,0 +1,331 @@
+import multiprocessing
+
+import numpy as np
+from scipy import sparse
+
+
+class LinkGraph():
+    """
+    A corpus as integer arrays, built once and reused every iteration.
+
+    pages[i] is the name of page i and the pages it links to are
+    indices[indptr[i]:indptr[i + 1]], i.e. the link matrix in compressed
+    sparse row form. The same links sorted by target are kept in
+    in_sources/in_targets together with in_weights = 1 / out_degree of
+    the source, which makes one step of the random surfer a single
+    weighted bincount.
+    """
+
+    def __init__(self, pages, indptr, indices):
+        self.pages = list(pages)
+        self.index = {page: i for i, page in enumerate(self.pages)}
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self.out_degree = np.diff(self.indptr)
+        self.dangling = self.out_degree == 0
+
+        sources = np.repeat(np.arange(len(self.pages), dtype=np.int32),
+                            self.out_degree)
+        order = np.argsort(self.indices, kind="stable")
+        self.in_sources = sources[order]
+        self.in_targets = self.indices[order]
+        self.in_weights = 1 / self.out_degree[self.in_sources]
+        self.matrix = None
+
+    @classmethod
+    def from_corpus(cls, corpus):
+        """
+        Builds a LinkGraph from a {page: set of linked pages} corpus,
+        ignoring links to pages that are not in the corpus.
+        """
+        pages = sorted(corpus)
+        index = {page: i for i, page in enumerate(pages)}
+        indptr = [0]
+        indices = []
+        for page in pages:
+            indices.extend(sorted(index[link] for link in corpus[page]
+                                  if link in index))
+            indptr.append(len(indices))
+        return cls(pages, indptr, indices)
+
+    def __len__(self):
+        return len(self.pages)
+
+    def spread(self, ranks):
+        """
+        Returns, for each page, the rank flowing into it along links when
+        every page splits its rank evenly over its outgoing links.
+        Rank on dangling pages is not spread.
+
+        `ranks` may also be an (n, k) array of k rank vectors as columns,
+        which are all spread by one sparse matrix-matrix product.
+        """
+        if ranks.ndim == 1:
+            flow = ranks[self.in_sources] * self.in_weights
+            return np.bincount(self.in_targets, weights=flow,
+                               minlength=len(self.pages))
+        return self.transition() @ ranks
+
+    def transition(self):
+        """
+        Returns the n x n sparse matrix whose column i spreads the rank of
+        page i evenly over the pages it links to, built on first use.
+        """
+        if self.matrix is None:
+            n = len(self.pages)
+            self.matrix = sparse.csr_matrix(
+                (self.in_weights, (self.in_targets, self.in_sources)),
+                shape=(n, n)
+            )
+        return self.matrix
+
+    def step(self, ranks, damping_factor):
+        """
+        Returns the ranks after one step of the random surfer: follow a
+        link with probability `damping_factor`, otherwise jump to any
+        page. Dangling pages are treated as linking to every page.
+        """
+        n = len(self.pages)
+        dangling = ranks[self.dangling].sum()
+        return (damping_factor * (self.spread(ranks) + dangling / n)
+                + (1 - damping_factor) / n)
+
+    def ranks(self, values):
+        """
+        Returns a {page: rank} dictionary for an array of ranks.
+        """
+        return dict(zip(self.pages, values.tolist()))
+
+
+def power_iteration(graph, damping_factor, tolerance=1e-6,
+                    max_iterations=1000, stats=None, start=None):
+    """
+    Returns the PageRank vector of `graph`, iterating from `start` (the
+    uniform distribution by default) until the L1 change in one step is
+    below `tolerance`. If `stats` is a dictionary, the number of
+    iterations and final residual are stored in it.
+    """
+    n = len(graph)
+    if start is None:
+        ranks = np.full(n, 1 / n)
+    else:
+        ranks = np.asarray(start, dtype=np.float64) / np.sum(start)
+    for iteration in range(1, max_iterations + 1):
+        new_ranks = graph.step(ranks, damping_factor)
+        residual = np.abs(new_ranks - ranks).sum()
+        ranks = new_ranks
+        if residual < tolerance:
+            break
+    if stats is not None:
+        stats["iterations"] = iteration
+        stats["residual"] = float(residual)
+    return ranks
+
+
+def partition(graph, parts):
+    """
+    Splits the pages of `graph` into `parts` contiguous slices with
+    about the same number of incoming links plus pages each, and returns
+    the page boundaries together with the matching boundaries in the
+    in_sources/in_targets arrays.
+    """
+    n = len(graph)
+    in_indptr = np.searchsorted(graph.in_targets, np.arange(n + 1))
+    cost = in_indptr + np.arange(n + 1)
+    pages = np.searchsorted(cost, np.linspace(0, cost[-1], parts + 1))
+    pages[0], pages[-1] = 0, n
+    return pages.tolist(), in_indptr[pages].tolist()
+
+
+def shared_array(values, dtype):
+    """
+    Returns a RawArray in shared memory holding a copy of `values`.
+    """
+    values = np.asarray(values, dtype=dtype)
+    shared = multiprocessing.RawArray(np.ctypeslib.as_ctypes_type(dtype),
+                                      max(1, values.size))
+    np.frombuffer(shared, dtype=dtype, count=values.size)[:] = values
+    return shared
+
+
+def partition_worker(shared, n, edges, damping_factor, pages, links,
+                     barrier):
+    """
+    Updates pages[0]:pages[1] of the new rank vector on every iteration,
+    from the in-links links[0]:links[1], until the main process sets
+    the stop flag.
+    """
+    sources = np.frombuffer(shared["sources"], dtype=np.int32, count=edges)
+    targets = np.frombuffer(shared["targets"], dtype=np.int32, count=edges)
+    weights = np.frombuffer(shared["weights"], dtype=np.float64, count=edges)
+    ranks = np.frombuffer(shared["ranks"], dtype=np.float64, count=n)
+    new_ranks = np.frombuffer(shared["new_ranks"], dtype=np.float64, count=n)
+    control = np.frombuffer(shared["control"], dtype=np.float64, count=2)
+
+    low, high = pages
+    sources = sources[links[0]:links[1]]
+    targets = targets[links[0]:links[1]] - low
+    weights = weights[links[0]:links[1]]
+    while True:
+        barrier.wait()
+        if control[1]:
+            return
+        flow = np.bincount(targets, weights=ranks[sources] * weights,
+                           minlength=high - low)
+        new_ranks[low:high] = (damping_factor * (flow + control[0] / n)
+                               + (1 - damping_factor) / n)
+        barrier.wait()
+
+
+def parallel_power_iteration(graph, damping_factor, processes,
+                             tolerance=1e-6, max_iterations=1000,
+                             stats=None):
+    """
+    Returns the PageRank vector of `graph` as `power_iteration` does,
+    with the pages partitioned across `processes` worker processes.
+
+    The in-links (the rows of the transition matrix) and both rank
+    vectors live in shared memory. In every iteration each worker
+    writes its slice of the new rank vector; the main process then
+    measures the residual, publishes the new ranks and the rank held
+    by dangling pages, and releases the workers again.
+    """
+    n = len(graph)
+    edges = len(graph.in_sources)
+    processes = max(1, min(processes, n))
+    shared = {
+        "sources": shared_array(graph.in_sources, np.int32),
+        "targets": shared_array(graph.in_targets, np.int32),
+        "weights": shared_array(graph.in_weights, np.float64),
+        "ranks": shared_array(np.full(n, 1 / n), np.float64),
+        "new_ranks": shared_array(np.zeros(n), np.float64),
+        "control": shared_array(np.zeros(2), np.float64),
+    }
+    ranks = np.frombuffer(shared["ranks"], dtype=np.float64, count=n)
+    new_ranks = np.frombuffer(shared["new_ranks"], dtype=np.float64, count=n)
+    control = np.frombuffer(shared["control"], dtype=np.float64, count=2)
+
+    pages, links = partition(graph, processes)
+    barrier = multiprocessing.Barrier(processes + 1)
+    workers = [
+        multiprocessing.Process(
+            target=partition_worker,
+            args=(shared, n, edges, damping_factor, pages[i:i + 2],
+                  links[i:i + 2], barrier),
+            daemon=True,
+        )
+        for i in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    try:
+        for iteration in range(1, max_iterations + 1):
+            control[0] = ranks[graph.dangling].sum()
+            barrier.wait()
+            barrier.wait()
+            residual = np.abs(new_ranks - ranks).sum()
+            ranks[:] = new_ranks
+            if residual < tolerance:
+                break
+        control[1] = 1
+        barrier.wait()
+    except BaseException:
+        # Releases workers still waiting, and stops them
+        barrier.abort()
+        for worker in workers:
+            worker.terminate()
+        raise
+    finally:
+        for worker in workers:
+            worker.join()
+    if stats is not None:
+        stats["iterations"] = iteration
+        stats["residual"] = float(residual)
+        stats["processes"] = processes
+    return ranks.copy()
+
+
+def personalized_iteration(graph, damping_factor, teleport, tolerance=1e-6,
+                           max_iterations=1000, stats=None):
+    """
+    Returns the personalized PageRank vectors of `graph` for every
+    column of `teleport`, an (n, k) array whose columns are each a
+    distribution over pages, as the columns of an (n, k) array.
+
+    The random surfer jumps according to a column of `teleport` rather
+    than uniformly, and so does any surfer on a dangling page. All k
+    columns are iterated together, until each one's L1 change in one
+    step is below `tolerance`, each iteration being one sparse
+    matrix-matrix product of the transition matrix with the block.
+    """
+    teleport = np.asarray(teleport, dtype=np.float64)
+    teleport = teleport / teleport.sum(axis=0)
+    ranks = teleport.copy()
+    residual = np.zeros(teleport.shape[1])
+    for iteration in range(1, max_iterations + 1):
+        dangling = ranks[graph.dangling].sum(axis=0)
+        new_ranks = (damping_factor * graph.spread(ranks)
+                     + (damping_factor * dangling + 1 - damping_factor)
+                     * teleport)
+        residual = np.abs(new_ranks - ranks).sum(axis=0)
+        ranks = new_ranks
+        if residual.max(initial=0) < tolerance:
+            break
+    if stats is not None:
+        stats["iterations"] = iteration
+        stats["residual"] = float(residual.max(initial=0))
+    return ranks
+
+
+def random_walks(graph, damping_factor, walkers, samples, seed=None):
+    """
+    Runs terminating random walks on `walkers` lanes advanced together as
+    arrays, about `samples` visits in all, and returns how often each
+    page was visited.
+
+    Each walk starts on a random page and at every step ends with
+    probability 1 - `damping_factor`; otherwise it follows one of the
+    page's links, or jumps to a random page if there are none. The
+    expected visits of such a walk are proportional to PageRank, and
+    since walks are always counted whole, the visit frequencies are an
+    unbiased estimate however many lanes there are. A lane whose walk
+    ends starts a new one until the walks under way are expected to use
+    up the rest of the sample budget.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(graph)
+    counts = np.zeros(n, dtype=np.int64)
+    if walkers <= 0 or samples <= 0:
+        return counts
+
+    # Visits are buffered and counted with one bincount per 2 ** 20
+    visits = []
+    buffered = counted = 0
+    position = rng.integers(n, size=walkers)
+    while position.size:
+        visits.append(position)
+        buffered += position.size
+        counted += position.size
+        if buffered >= 2 ** 20:
+            counts += np.bincount(np.concatenate(visits), minlength=n)
+            visits = []
+            buffered = 0
+
+        lanes = position.size
+        going = rng.random(lanes) < damping_factor
+        following = rng.integers(n, size=lanes)
+        if graph.indices.size:
+            degree = graph.out_degree[position]
+            offset = (rng.random(lanes) * degree).astype(np.int64)
+            link = np.minimum(graph.indptr[position] + offset,
+                              graph.indices.size - 1)
+            following = np.where(degree > 0, graph.indices[link], following)
+        # Open walks are expected to visit 1 / (1 - damping_factor)
+        # more pages each, so new ones stop before the budget is spent
+        if counted + lanes / (1 - damping_factor) < samples:
+            position = np.where(going, following, rng.integers(n, size=lanes))
+        else:
+            position = following[going]
+    if visits:
+        counts += np.bincount(np.concatenate(visits), minlength=n)
+    return counts
@@ -1,54 +1,245 @@
+import argparse
+import json
+import math
+import multiprocessing
 import os
 import random
 import re
-import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy.stats import t as student_t
+
+from linkgraph import (LinkGraph, parallel_power_iteration,
+                       personalized_iteration, power_iteration, random_walks)
 
 DAMPING = 0.85
 SAMPLES = 10000
 
+LINK_PATTERN = re.compile(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"")
+CHUNK_SIZE = 1 << 16
+CHUNK_OVERLAP = 4096
+
+# Corpora smaller than this are not worth starting worker processes for
+PARALLEL_PAGES = 256
+
+# Links found by the last crawl, kept inside the corpus directory
+CRAWL_CACHE = ".crawl-cache.json"
+CRAWL_CACHE_VERSION = 1
+
+# Adaptive sampling takes batches of this many steps per page, and
+# estimates confidence intervals from at least this many batches
+BATCH_STEPS = 25
+MIN_BATCHES = 5
+
+# iterate_pagerank extrapolates from recent iterates this often
+EXTRAPOLATION_PERIOD = 10
+
 
 def main():
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python pagerank.py corpus")
-    corpus = crawl(sys.argv[1])
-    ranks = sample_pagerank(corpus, DAMPING, SAMPLES)
-    print(f"PageRank Results from Sampling (n = {SAMPLES})")
+    parser = argparse.ArgumentParser()
+    parser.add_argument("corpus")
+    parser.add_argument("--matrix", action="store_true",
+                        help="iterate with the sparse matrix engine")
+    parser.add_argument("--tolerance", type=float,
+                        help="convergence tolerance (default 1e-6 in L1 for "
+                             "--matrix, 0.001 in --norm otherwise)")
+    parser.add_argument("--method", choices=["jacobi", "gauss-seidel"],
+                        default="jacobi")
+    parser.add_argument("--extrapolation", choices=["aitken", "quadratic"])
+    parser.add_argument("--norm", choices=sorted(NORMS), default="max")
+    parser.add_argument("--trace", action="store_true",
+                        help="print the residual of every iteration")
+    parser.add_argument("--personalize", action="append", default=[],
+                        metavar="PAGE[,PAGE...]",
+                        help="also rank pages for surfers who jump only to "
+                             "these pages; may be repeated")
+    parser.add_argument("--walkers", type=int, default=0,
+                        help="sample with this many vectorized walkers")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="processes to shard --walkers and --matrix "
+                             "across")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--width", type=float,
+                        help="sample until every 95%% confidence interval "
+                             "is narrower than this")
+    parser.add_argument("--max-samples", type=int, default=10 ** 8,
+                        help="upper bound on samples for --width")
+    parser.add_argument("--no-cache", dest="cache", action="store_false",
+                        help="parse every page instead of using the crawl cache")
+    args = parser.parse_args()
+
+    corpus = crawl(args.corpus, cache=args.cache)
+    stats = {}
+    if args.walkers:
+        ranks = walker_pagerank(corpus, DAMPING, SAMPLES, args.walkers,
+                                args.seed, args.processes, stats)
+    elif args.width:
+        random.seed(args.seed)
+        ranks = sample_pagerank(corpus, DAMPING, args.max_samples, stats,
+                                width=args.width)
+        print(f"Sampling stopped with 95% confidence intervals at most "
+              f"{stats['error']:.4f} wide")
+    else:
+        random.seed(args.seed)
+        ranks = sample_pagerank(corpus, DAMPING, SAMPLES, stats)
+    print(f"PageRank Results from Sampling (n = {stats['samples']}, "
+          f"{stats['samples_per_second']:.0f} samples/s)")
     for page in sorted(ranks):
         print(f"  {page}: {ranks[page]:.4f}")
-    ranks = iterate_pagerank(corpus, DAMPING)
-    print(f"PageRank Results from Iteration")
+    if args.matrix:
+        stats = {}
+        tolerance = 1e-6 if args.tolerance is None else args.tolerance
+        if args.processes > 1:
+            ranks = parallel_pagerank(corpus, DAMPING, args.processes,
+                                      tolerance, stats)
+        else:
+            ranks = matrix_pagerank(corpus, DAMPING, tolerance, stats)
+        print(f"PageRank Results from Sparse Matrix "
+              f"({stats['iterations']} iterations)")
+    else:
+        stats = {}
+        tolerance = 0.001 if args.tolerance is None else args.tolerance
+        ranks = iterate_pagerank(corpus, DAMPING, args.method,
+                                 args.extrapolation, args.norm, tolerance,
+                                 stats=stats)
+        if args.trace:
+            for iteration, residual in enumerate(stats["residuals"], 1):
+                print(f"  iteration {iteration}: {args.norm} residual "
+                      f"{residual:.3e}")
+        print(f"PageRank Results from Iteration "
+              f"({stats['iterations']} iterations)")
     for page in sorted(ranks):
         print(f"  {page}: {ranks[page]:.4f}")
 
+    if args.personalize:
+        seeds = [pages.split(",") for pages in args.personalize]
+        for pages, ranks in zip(args.personalize,
+                                personalized_pagerank(corpus, DAMPING, seeds)):
+            print(f"Personalized PageRank Results for {pages}")
+            for page in sorted(ranks):
+                print(f"  {page}: {ranks[page]:.4f}")
 
-def crawl(directory):
+
+def crawl(directory, workers=None, cache=True, stats=None):
     """
     Parse a directory of HTML pages and check for links to other pages.
     Return a dictionary where each key is a page, and values are
     a list of all other pages in the corpus that are linked to by the page.
-    """
-    pages = dict()
 
-    # Extract all links from HTML files
-    for filename in os.listdir(directory):
-        if not filename.endswith(".html"):
-            continue
-        with open(os.path.join(directory, filename)) as f:
-            contents = f.read()
-            links = re.findall(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"", contents)
-            pages[filename] = set(links) - {filename}
+    Large corpora are parsed across `workers` processes (all cores by
+    default), each file streamed in chunks by `extract_links`.
+
+    With `cache`, the links found in each file are saved in CRAWL_CACHE
+    inside the corpus together with the file's mtime and size, and on
+    the next crawl only files that were added or changed are parsed.
+    If `stats` is a dictionary, the number of files parsed and reused
+    from the cache are stored in it.
+    """
+    files = {}
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name.endswith(".html") and entry.is_file():
+                stat = entry.stat()
+                files[entry.name] = (entry.path, stat.st_mtime_ns, stat.st_size)
+
+    cached = read_crawl_cache(directory) if cache else {}
+    links = {}
+    changed = {}
+    for filename, (path, mtime, size) in files.items():
+        entry = cached.get(filename)
+        if entry is not None and entry[:2] == [mtime, size]:
+            links[filename] = set(entry[2])
+        else:
+            changed[filename] = path
+
+    # Extract all links from new or changed HTML files
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(changed) >= PARALLEL_PAGES:
+        chunksize = max(1, len(changed) // (8 * workers))
+        with ProcessPoolExecutor(workers) as pool:
+            found = pool.map(extract_links, changed.values(), chunksize=chunksize)
+            links.update(zip(changed, found))
+    else:
+        for filename, path in changed.items():
+            links[filename] = extract_links(path)
+
+    if cache and (changed or len(cached) != len(files)):
+        write_crawl_cache(directory, {
+            filename: [mtime, size, sorted(links[filename])]
+            for filename, (_, mtime, size) in files.items()
+        })
+    if stats is not None:
+        stats["parsed"] = len(changed)
+        stats["cached"] = len(files) - len(changed)
 
     # Only include links to other pages in the corpus
-    for filename in pages:
+    pages = dict()
+    for filename in links:
         pages[filename] = set(
-            link for link in pages[filename]
-            if link in pages
+            link for link in links[filename]
+            if link in links and link != filename
         )
 
-    print(pages)
     return pages
 
 
+def read_crawl_cache(directory):
+    """
+    Return the {filename: [mtime_ns, size, links]} entries saved by the
+    last crawl of `directory`, or an empty dictionary.
+    """
+    try:
+        with open(os.path.join(directory, CRAWL_CACHE), encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if cache.get("version") != CRAWL_CACHE_VERSION:
+        return {}
+    return cache["files"]
+
+
+def write_crawl_cache(directory, files):
+    """
+    Save crawl cache entries, replacing the old cache atomically. A
+    read-only corpus simply goes without a cache.
+    """
+    path = os.path.join(directory, CRAWL_CACHE)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump({"version": CRAWL_CACHE_VERSION, "files": files}, f)
+        os.replace(temporary, path)
+    except OSError:
+        pass
+
+
+def extract_links(path):
+    """
+    Return the set of href targets of the <a> tags in an HTML file,
+    reading it in chunks so that large files are never held in memory.
+
+    The end of each chunk is carried over to the next so that a tag
+    split across two chunks is still found, as long as it is shorter
+    than CHUNK_OVERLAP characters.
+    """
+    links = set()
+    with open(path) as f:
+        tail = ""
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            text = tail + chunk
+            end = 0
+            for match in LINK_PATTERN.finditer(text):
+                links.add(match.group(1))
+                end = match.end()
+            tail = text[max(end, len(text) - CHUNK_OVERLAP):]
+    return links
+
+
 def transition_model(corpus, page, damping_factor):
     """
     Return a probability distribution over which page to visit next,
@@ -85,7 +276,8 @@ def transition_model(corpus, page, damping_factor):
     return distribution
 
 
-def sample_pagerank(corpus, damping_factor, n):
+def sample_pagerank(corpus, damping_factor, n, stats=None, width=None,
+                    confidence=0.95):
     """
     Return PageRank values for each page by sampling `n` pages
     according to transition model, starting with a page at random.
@@ -93,117 +285,377 @@ def sample_pagerank(corpus, damping_factor, n):
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
+
+    The transition model of every page is a mix of two uniform choices:
+    one of its links with probability `damping_factor`, otherwise any
+    page (any page at all for pages without links). So instead of
+    rebuilding `transition_model` over the whole corpus on every step,
+    each page's links are turned into a tuple of page numbers once and
+    every sample costs O(1).
+
+    If `width` is given, `n` is only an upper bound: samples are taken
+    in batches and sampling stops as soon as every page's `confidence`
+    interval, estimated from the spread of the batch means of at least
+    MIN_BATCHES batches with Student's t distribution, is narrower than
+    `width`. If `stats` is a dictionary, the number of samples, samples
+    per second and (with `width`) the widest interval achieved are
+    stored in it.
     """
-    ranking = {}
+    if n < 1:
+        raise ValueError(f"cannot estimate PageRank from {n} samples")
+    start = time.perf_counter()
+
+    pages = list(corpus)
+    index = {page: i for i, page in enumerate(pages)}
+    links = [
+        tuple(index[link] for link in corpus[page] if link in index)
+        for page in pages
+    ]
+    total = len(pages)
+    counts = [0] * total
+
+    def walk(page, samples, visits):
+        for _ in range(samples):
+            targets = links[page]
+            if targets and random.random() < damping_factor:
+                page = targets[int(random.random() * len(targets))]
+            else:
+                page = int(random.random() * total)
+            visits[page] += 1
+        return page
+
+    page = random.randrange(total)
+    if width is None:
+        counts[page] += 1
+        walk(page, n - 1, counts)
+        used = n
+    else:
+        # Batch means: each batch's visit frequencies are one estimate.
+        # Batches grow with the corpus but are shrunk so that `n`
+        # samples still give MIN_BATCHES of them.
+        batch = max(1, min(BATCH_STEPS * total, n // MIN_BATCHES))
+        sums, squares = [0.0] * total, [0.0] * total
+        batches = used = 0
+        error = float("inf")
+        while used + batch <= n:
+            visits = [0] * total
+            page = walk(page, batch, visits)
+            for i, visited in enumerate(visits):
+                frequency = visited / batch
+                sums[i] += frequency
+                squares[i] += frequency * frequency
+                counts[i] += visited
+            batches += 1
+            used += batch
+            if batches >= 2:
+                variance = max(
+                    (squares[i] - sums[i] * sums[i] / batches) / (batches - 1)
+                    for i in range(total)
+                )
+                # So few batch means are t, not normally, distributed
+                t = student_t.ppf(0.5 + confidence / 2, batches - 1)
+                error = 2 * t * math.sqrt(max(variance, 0) / batches)
+            if batches >= MIN_BATCHES and error < width:
+                break
+        if stats is not None:
+            stats["error"] = error
+            stats["confidence"] = confidence
 
-    list = []
-    for object in corpus.keys():
-        if object not in list:
-            list.append(object)
+    if stats is not None:
+        elapsed = time.perf_counter() - start
+        stats["samples"] = used
+        stats["samples_per_second"] = used / elapsed if elapsed else float("inf")
+    return {pages[i]: counts[i] / used for i in range(total)}
 
-    for item in list:
-        if item not in ranking.keys():
-            ranking[item] = 0
 
-    first_page = random.choice(list)
-    print(first_page)
+def walker_pagerank(corpus, damping_factor, n, walkers=1000, seed=None,
+                    processes=1, stats=None):
+    """
+    Return PageRank values for each page by sampling about `n` pages
+    with terminating random walks on `walkers` lanes that are advanced
+    together as NumPy arrays, optionally sharded across `processes`.
+
+    A walk visits 1 / (1 - damping_factor) pages on average, so no more
+    lanes are used than the about n * (1 - damping_factor) walks the
+    budget pays for. The same `seed` (and number of processes) gives
+    the same result.
+    Return a dictionary where keys are page names, and values are
+    their estimated PageRank value (a value between 0 and 1). All
+    PageRank values should sum to 1.
+    """
+    start = time.perf_counter()
+    graph = LinkGraph.from_corpus(corpus)
+    walkers = max(1, min(walkers, math.ceil(n * (1 - damping_factor))))
+
+    processes = max(1, min(processes, walkers))
+    seeds = np.random.SeedSequence(seed).spawn(processes)
+    shards = []
+    for i in range(processes):
+        lanes = walkers // processes + (i < walkers % processes)
+        shards.append((graph, damping_factor, lanes,
+                       -(-n * lanes // walkers), seeds[i]))
+    if processes == 1:
+        counts = random_walks(*shards[0])
+    else:
+        with multiprocessing.Pool(processes) as pool:
+            counts = sum(pool.starmap(random_walks, shards))
+
+    if stats is not None:
+        elapsed = time.perf_counter() - start
+        stats["samples"] = int(counts.sum())
+        stats["samples_per_second"] = stats["samples"] / elapsed
+    return graph.ranks(counts / counts.sum())
+
+
+def iterate_pagerank(corpus, damping_factor, method="jacobi",
+                     extrapolation=None, norm="max", tolerance=0.001,
+                     max_iterations=10000, stats=None):
+    """
+    Return PageRank values for each page by iteratively updating
+    PageRank values until convergence.
 
-    distribution = transition_model(corpus, first_page, damping_factor)
-    print(distribution)
+    Return a dictionary where keys are page names, and values are
+    their estimated PageRank value (a value between 0 and 1). All
+    PageRank values should sum to 1.
 
-    population = []
-    for object in distribution.keys():
-        if object not in population:
-            population.append(object)
-    print('population:', population)
+    `method` is "jacobi", which computes every new value from the
+    previous iteration, or "gauss-seidel", which uses values already
+    updated in the current sweep. `extrapolation` may be "aitken" or
+    "quadratic" to jump ahead from the last few iterates every
+    EXTRAPOLATION_PERIOD iterations. Iteration stops once the change
+    between iterations, measured in the `norm` given ("max", "l1" or
+    "l2"), is below `tolerance`. If `stats` is a dictionary, the number
+    of iterations and the residual of each one are stored in it.
+    """
+    if method not in ("jacobi", "gauss-seidel"):
+        raise ValueError(f"unknown method {method!r}")
+    if extrapolation not in (None, "aitken", "quadratic"):
+        raise ValueError(f"unknown extrapolation {extrapolation!r}")
+    if norm not in NORMS:
+        raise ValueError(f"unknown norm {norm!r}")
+
+    pages = list(corpus)
+    n = len(pages)
+    index = {page: i for i, page in enumerate(pages)}
+
+    # A page with no links is treated as linking to every page, which
+    # adds the same share of its rank to every page; that share is kept
+    # as one total per sweep instead of n links per such page
+    incoming = [[] for _ in pages]
+    links = []
+    dangling = []
+    for i, page in enumerate(pages):
+        targets = [index[link] for link in corpus[page] if link in index]
+        if not targets:
+            dangling.append(i)
+        links.append(len(targets))
+        for j in targets:
+            incoming[j].append(i)
+    is_dangling = [not count for count in links]
+
+    rank = [1 / n] * n
+    history = [rank]
+    residuals = []
+    for iteration in range(1, max_iterations + 1):
+        if method == "gauss-seidel":
+            new_rank = list(rank)
+            dangling_rank = sum(new_rank[j] for j in dangling)
+            for i in range(n):
+                value = (1 - damping_factor) / n + damping_factor * (
+                    dangling_rank / n
+                    + sum(new_rank[j] / links[j] for j in incoming[i])
+                )
+                if is_dangling[i]:
+                    dangling_rank += value - new_rank[i]
+                new_rank[i] = value
+            new_rank = normalized(new_rank)
+        else:
+            dangling_share = sum(rank[j] for j in dangling) / n
+            new_rank = [
+                (1 - damping_factor) / n + damping_factor * (
+                    dangling_share
+                    + sum(rank[j] / links[j] for j in incoming[i])
+                )
+                for i in range(n)
+            ]
+
+        residual = NORMS[norm](new - old for new, old in zip(new_rank, rank))
+        residuals.append(residual)
+        rank = new_rank
+        if residual < tolerance:
+            break
+
+        history = history[-3:] + [rank]
+        if extrapolation and iteration % EXTRAPOLATION_PERIOD == 0:
+            rank = EXTRAPOLATIONS[extrapolation](history)
+            history = [rank]
+
+    if stats is not None:
+        stats["iterations"] = iteration
+        stats["residuals"] = residuals
+    return dict(zip(pages, rank))
+
+
+def normalized(rank):
+    """
+    Return `rank` with negative values clipped to 0, scaled to sum to 1.
+    """
+    rank = [max(value, 0) for value in rank]
+    total = sum(rank)
+    return [value / total for value in rank]
+
+
+def aitken(history):
+    """
+    Return the Aitken delta-squared extrapolation, page by page, of the
+    last three iterates in `history`.
+    """
+    if len(history) < 3:
+        return history[-1]
+    extrapolated = []
+    for x0, x1, x2 in zip(*history[-3:]):
+        second = x2 - 2 * x1 + x0
+        if abs(second) < 1e-15:
+            extrapolated.append(x2)
+        else:
+            extrapolated.append(x0 - (x1 - x0) ** 2 / second)
+    return normalized(extrapolated)
+
+
+def quadratic(history):
+    """
+    Return the quadratic extrapolation of the last four iterates in
+    `history`, which removes the components along the second and third
+    eigenvectors by fitting a degree-3 minimal polynomial to them in
+    the least-squares sense.
+    """
+    if len(history) < 4:
+        return history[-1]
+    x0, x1, x2, x3 = history[-4:]
+    y1 = [a - b for a, b in zip(x1, x0)]
+    y2 = [a - b for a, b in zip(x2, x0)]
+    y3 = [a - b for a, b in zip(x3, x0)]
+
+    # Solve [y1 y2] (g1, g2) = -y3 by the normal equations
+    a11 = sum(a * a for a in y1)
+    a12 = sum(a * b for a, b in zip(y1, y2))
+    a22 = sum(b * b for b in y2)
+    b1 = -sum(a * c for a, c in zip(y1, y3))
+    b2 = -sum(b * c for b, c in zip(y2, y3))
+    determinant = a11 * a22 - a12 * a12
+    if abs(determinant) < 1e-300:
+        return x3
+    g1 = (b1 * a22 - b2 * a12) / determinant
+    g2 = (a11 * b2 - a12 * b1) / determinant
+    g3 = 1
+    beta0, beta1, beta2 = g1 + g2 + g3, g2 + g3, g3
+    return normalized([beta0 * a + beta1 * b + beta2 * c
+                       for a, b, c in zip(x1, x2, x3)])
 
-    weights = []
-    for object in distribution.values():
-        weights.append(object)
-    print('weights:', weights)
 
-    for item in ranking.keys():
-        if item == first_page:
-            ranking[item] = ranking[item] + 0.0001
+def max_norm(differences):
+    return max((abs(d) for d in differences), default=0)
 
-    sample = 1
 
-    while sample < n:
-        choice = random.choices(population, weights=weights, k=1)
-        page = choice[0]
-        distribution = transition_model(corpus, page, damping_factor)
+def l1_norm(differences):
+    return sum(abs(d) for d in differences)
 
-        weights = []
-        for object in distribution.values():
-            weights.append(object)
 
-        for item in ranking.keys():
-            if item == page:
-                ranking[item] = ranking[item] + 0.0001
-        sample = sample + 1
+def l2_norm(differences):
+    return math.sqrt(sum(d * d for d in differences))
 
-    return ranking
 
+NORMS = {"max": max_norm, "l1": l1_norm, "l2": l2_norm}
+EXTRAPOLATIONS = {"aitken": aitken, "quadratic": quadratic}
 
-def iterate_pagerank(corpus, damping_factor):
+
+def matrix_pagerank(corpus, damping_factor, tolerance=1e-6, stats=None):
     """
-    Return PageRank values for each page by iteratively updating
-    PageRank values until convergence.
+    Return PageRank values for each page by power iteration over a
+    sparse transition matrix built once from the corpus, until the
+    L1 change between iterations is below `tolerance`.
 
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
-
     """
+    graph = LinkGraph.from_corpus(corpus)
+    return graph.ranks(power_iteration(graph, damping_factor, tolerance,
+                                       stats=stats))
 
-    distribution = {}
-    page = dict()
-    links = dict()
 
-    for i in corpus:
-        distribution[i] = set()
-
-        if (len(corpus[i]) == 0):
-            corpus[i] = set(corpus.keys())
-    print(distribution)
-    print(set(corpus.keys()))
+def parallel_pagerank(corpus, damping_factor, processes, tolerance=1e-6,
+                      stats=None):
+    """
+    Return PageRank values for each page as `matrix_pagerank` does, with
+    the pages partitioned across `processes` worker processes that
+    share the transition matrix and rank vectors in shared memory.
+    """
+    graph = LinkGraph.from_corpus(corpus)
+    return graph.ranks(parallel_power_iteration(graph, damping_factor,
+                                                processes, tolerance,
+                                                stats=stats))
 
-    n = len(distribution.keys())
 
-    for object in corpus.keys():
-        for item in corpus[object]:
-            distribution[item].add(object)
-        links[object] = len(corpus[object])
-    print(distribution)
-    print(links)
-    print(corpus)
-
-    for key in corpus.keys():
-        page[key] = 1 / n
-
-    while True:
-        new_page = dict()
-        for item in distribution.keys():
-            new_page[item] = (1 - damping_factor) / n
-            for object in distribution[item]:
-                new_page[item] += damping_factor * page[object]/links[object]
-
-
-        active = True
-        if active:
-            for i in corpus:
-                diff = abs(new_page[i] - page[i])
-                # limit difference to .001
-                if diff >= .001:
-                    active = False
-                # compare difference and update to sample
-                page[i] = new_page[i]
-            # end iteration if udner .001
-            if active:
-                break
+def personalized_pagerank(corpus, damping_factor, seeds, tolerance=1e-6,
+                          stats=None):
+    """
+    Return personalized PageRank values for every seed set in `seeds`,
+    as a list of dictionaries in the same order.
+
+    Each seed set is either a collection of pages, which the random
+    surfer jumps to with equal probability, or a {page: weight}
+    dictionary. All seed sets are solved together as the columns of
+    one block, so each iteration is a single pass over the links
+    however many seed sets there are.
+    """
+    graph = LinkGraph.from_corpus(corpus)
+    teleport = np.zeros((len(graph), len(seeds)))
+    for column, seed in enumerate(seeds):
+        weights = seed if isinstance(seed, dict) else dict.fromkeys(seed, 1)
+        for page, weight in weights.items():
+            if page not in graph.index:
+                raise ValueError(f"{page} is not in the corpus")
+            teleport[graph.index[page], column] = weight
+        if teleport[:, column].sum() <= 0:
+            raise ValueError(f"seed set {column} has no weight")
+    ranks = personalized_iteration(graph, damping_factor, teleport, tolerance,
+                                   stats=stats)
+    return [graph.ranks(column) for column in ranks.T]
+
+
+def apply_delta(corpus, added=(), removed=()):
+    """
+    Return a copy of `corpus` with the (page, linked page) links in
+    `removed` taken out and those in `added` put in. Pages that only
+    appear in `added` become new pages of the corpus.
+    """
+    corpus = {page: set(links) for page, links in corpus.items()}
+    for page, link in removed:
+        corpus.get(page, set()).discard(link)
+    for page, link in added:
+        corpus.setdefault(page, set()).add(link)
+        corpus.setdefault(link, set())
+    return corpus
 
 
-    return page
+def update_pagerank(corpus, ranks, damping_factor, added=(), removed=(),
+                    tolerance=1e-6, stats=None):
+    """
+    Return PageRank values for `corpus` after the link changes in
+    `added` and `removed` (see `apply_delta`), given the `ranks`
+    previously computed for `corpus`.
+
+    Power iteration is warm-started from the old ranks, with new pages
+    starting at 1/n, instead of from the uniform distribution. When
+    only a few links change the old ranks are already close, so far
+    fewer iterations are needed to reach `tolerance`.
+    """
+    corpus = apply_delta(corpus, added, removed)
+    graph = LinkGraph.from_corpus(corpus)
+    start = np.array([ranks.get(page, 1 / len(graph)) for page in graph.pages])
+    return graph.ranks(power_iteration(graph, damping_factor, tolerance,
+                                       stats=stats, start=start))
 
 
 if __name__ == "__main__":